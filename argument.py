@@ -1,4 +1,50 @@
+import re
+
+from variable import Variable
+
+
 class Argument:
+    escape_sequence = re.compile(r'\\(\d{3})')
+
     def __init__(self, arg_type: str, value: str):
         self.type = arg_type
         self.value = value
+        self.frame = None
+        self.name = None
+        self.constant = None
+        # Layout of the frame and index of the variable in it, see Frame
+        self.layout = None
+        self.slot = None
+
+        if self.type == 'var':
+            self.frame, _, self.name = (value or '').partition('@')
+        else:
+            self.constant = Variable(self.type, Argument.decode_constant(self.type, value))
+
+    # Converts the constant to its Python value, invalid literals are kept as they are and reported on use
+    @staticmethod
+    def decode_constant(const_type: str, value: str):
+        if const_type == 'int':
+            try:
+                return int(value)
+            except (ValueError, TypeError):
+                return value
+        elif const_type == 'float':
+            try:
+                return float(value)
+            except (ValueError, TypeError):
+                try:
+                    return float.fromhex(value)
+                except (ValueError, TypeError):
+                    return value
+        elif const_type == 'bool':
+            return value is not None and value.lower() == 'true'
+        elif const_type == 'nil':
+            return None
+        elif const_type == 'string':
+            if value is None:
+                return ''
+            if '\\' in value:
+                return Argument.escape_sequence.sub(lambda match: chr(int(match.group(1))), value)
+
+        return value
@@ -10,18 +10,18 @@ class ArithmeticsType(Enum):
 
 
 class ArithmeticEvaluator:
+    funcs = {
+        ArithmeticsType.ADD: lambda a, b: a + b,
+        ArithmeticsType.SUB: lambda a, b: a - b,
+        ArithmeticsType.IDIV: lambda a, b: a // b,
+        ArithmeticsType.MUL: lambda a, b: a * b,
+        ArithmeticsType.DIV: lambda a, b: a / b
+    }
+
     def __init__(self, value1: int or float, value2: int or float, ot: ArithmeticsType):
         self.v1 = value1
         self.v2 = value2
         self.type = ot
 
     def eval(self) -> int or float:
-        funcs = {
-            ArithmeticsType.ADD: lambda a, b: a + b,
-            ArithmeticsType.SUB: lambda a, b: a - b,
-            ArithmeticsType.IDIV: lambda a, b: a // b,
-            ArithmeticsType.MUL: lambda a, b: a * b,
-            ArithmeticsType.DIV: lambda a, b: a / b
-        }
-
-        return funcs[self.type](self.v1, self.v2)
+        return ArithmeticEvaluator.funcs[self.type](self.v1, self.v2)
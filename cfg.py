@@ -0,0 +1,173 @@
+# Basic block: instructions [start, end) of the program which are always executed one after another
+class BasicBlock:
+    def __init__(self, index: int, start: int, end: int):
+        self.index = index
+        self.start = start
+        self.end = end
+        # Blocks which can be executed next in the same function (a CALL continues after the called function returns)
+        self.successors = []
+        self.predecessors = []
+        # Entry block of the function called at the end of the block
+        self.callee = None
+
+    def __repr__(self):
+        return f'BasicBlock({self.index}, {self.start}, {self.end})'
+
+
+# Control-flow graph of a linked program (every jump and CALL has its target)
+class ControlFlowGraph:
+    # Instructions which end a basic block
+    terminators = ('JUMP', 'JUMPIFEQ', 'JUMPIFNEQ', 'JUMPIFEQS', 'JUMPIFNEQS', 'CALL', 'RETURN', 'EXIT')
+    # Instructions which never continue with the next one
+    no_fall_through = ('JUMP', 'RETURN', 'EXIT')
+
+    def __init__(self, instructions: list):
+        self.instructions = instructions
+        self.blocks = []
+        # Maps the position of the first instruction of every block to the block
+        self.block_at = dict()
+
+        self.build_blocks()
+        self.build_edges()
+
+    def build_blocks(self):
+        start = 0
+        for pos, i in enumerate(self.instructions):
+            if i.opcode == 'LABEL' and pos != start:
+                self.add_block(start, pos)
+                start = pos
+
+            if i.opcode in ControlFlowGraph.terminators:
+                self.add_block(start, pos + 1)
+                start = pos + 1
+
+        if start != len(self.instructions):
+            self.add_block(start, len(self.instructions))
+
+    def add_block(self, start: int, end: int):
+        block = BasicBlock(len(self.blocks), start, end)
+        self.blocks.append(block)
+        self.block_at[start] = block
+
+    def build_edges(self):
+        for block in self.blocks:
+            last = self.instructions[block.end - 1]
+            if last.opcode == 'CALL':
+                block.callee = self.block_at[last.target]
+            elif last.target is not None:
+                block.successors.append(self.block_at[last.target])
+
+            if last.opcode not in ControlFlowGraph.no_fall_through and block.end in self.block_at:
+                next_block = self.block_at[block.end]
+                if next_block not in block.successors:
+                    block.successors.append(next_block)
+
+        for block in self.blocks:
+            for successor in block.successors:
+                successor.predecessors.append(block)
+
+    @staticmethod
+    def edges(block: BasicBlock) -> list:
+        if block.callee is None:
+            return block.successors
+
+        return block.successors + [block.callee]
+
+    # Returns the blocks which can be executed, in the order they were reached
+    def reachable(self) -> list:
+        if not self.blocks:
+            return []
+
+        visited = {self.blocks[0]}
+        result = []
+        stack = [self.blocks[0]]
+        while stack:
+            block = stack.pop()
+            result.append(block)
+            for successor in ControlFlowGraph.edges(block):
+                if successor not in visited:
+                    visited.add(successor)
+                    stack.append(successor)
+
+        return result
+
+    def unreachable(self) -> list:
+        reachable = set(self.reachable())
+        return [b for b in self.blocks if b not in reachable]
+
+    # Returns a set of dominators (including the block itself) for every reachable block, the program
+    # entry is the root and called functions are entered through their CALL instructions
+    def dominators(self) -> dict:
+        blocks = self.reachable()
+        if not blocks:
+            return dict()
+
+        predecessors = {b: [] for b in blocks}
+        for b in blocks:
+            for successor in ControlFlowGraph.edges(b):
+                predecessors[successor].append(b)
+
+        entry = self.blocks[0]
+        everything = set(blocks)
+        dominators = {b: set(everything) for b in blocks}
+        dominators[entry] = {entry}
+
+        changed = True
+        while changed:
+            changed = False
+            for b in blocks:
+                if b is entry:
+                    continue
+
+                new = set.intersection(*(dominators[p] for p in predecessors[b])) | {b}
+                if new != dominators[b]:
+                    dominators[b] = new
+                    changed = True
+
+        return dominators
+
+    # Returns blocks which are targets of a back edge (the target dominates the source of the edge)
+    def loop_headers(self) -> set:
+        dominators = self.dominators()
+        headers = set()
+        for block, block_dominators in dominators.items():
+            for successor in block.successors:
+                if successor in block_dominators:
+                    headers.add(successor)
+
+        return headers
+
+    # Returns the labels of functions called from the main program (None) and from every called function
+    def call_graph(self) -> dict:
+        graph = dict()
+        functions = [None]
+        entries = {None: self.blocks[0]} if self.blocks else dict()
+
+        while functions:
+            function = functions.pop()
+            callees = graph.setdefault(function, set())
+            for block in self.function_blocks(entries[function]):
+                if block.callee is None:
+                    continue
+
+                label = self.instructions[block.callee.start].args[0].value
+                callees.add(label)
+                if label not in entries:
+                    entries[label] = block.callee
+                    functions.append(label)
+
+        return graph
+
+    # Returns the blocks which can be executed by the function starting with the entry block
+    @staticmethod
+    def function_blocks(entry: BasicBlock) -> list:
+        visited = {entry}
+        stack = [entry]
+        while stack:
+            block = stack.pop()
+            for successor in block.successors:
+                if successor not in visited:
+                    visited.add(successor)
+                    stack.append(successor)
+
+        return list(visited)
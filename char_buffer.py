@@ -0,0 +1,31 @@
+from string_value import StringValue
+
+
+# Mutable value of a string variable updated by SETCHAR. Characters are stored in a list and replaced in place,
+# the text is built (and cached until the next change) only when the whole value is needed. MOVE and PUSHS share
+# the buffer between variables and mark it as shared, SETCHAR then copies it before the change (copy-on-write).
+class CharBuffer(StringValue):
+    __slots__ = ('chars', 'shared', 'flat')
+
+    def __init__(self, text: str):
+        self.chars = list(text)
+        self.shared = False
+        self.flat = text
+
+    def set(self, index: int, char: str):
+        self.chars[index] = char
+        self.flat = None
+
+    def __str__(self):
+        if self.flat is None:
+            self.flat = ''.join(self.chars)
+        return self.flat
+
+    def __len__(self):
+        return len(self.chars)
+
+    def __getitem__(self, index):
+        if type(index) is int:
+            return self.chars[index]
+
+        return str(self)[index]
@@ -0,0 +1,259 @@
+from cfg import ControlFlowGraph
+from char_buffer import CharBuffer
+from exit_code import InterpretError
+
+
+# Translates a linked program to Python source (--compile). Every block of instructions becomes a function which
+# executes the block and returns the function of the next block (None at the end of the program). Instructions
+# with proven operand types (see TypeInference) work directly with the values of variables, other instructions call
+# their handler, which is the reference implementation of the instruction. Superinstructions (see Optimizer) are
+# generated as their parts.
+class CodeGenerator:
+    # Compiled code objects keyed by the generated source, programs with the same code are compiled only once
+    code_cache = dict()
+    code_cache_size = 256
+
+    arithmetic_operators = {'ADD': '+', 'SUB': '-', 'MUL': '*', 'IDIV': '//', 'DIV': '/'}
+    logic_operators = {'LT': '<', 'GT': '>', 'EQ': '==', 'AND': 'and', 'OR': 'or'}
+
+    def __init__(self, instructions: list):
+        self.instructions = instructions
+        self.namespace = {'InterpretError': InterpretError, 'CharBuffer': CharBuffer}
+        self.names = dict()
+        self.lines = []
+        self.entries = []
+
+    # Returns the function of the first block or None for an empty program
+    def compile(self):
+        self.entries = self.find_entries()
+        for index, start in enumerate(self.entries):
+            end = self.entries[index + 1] if index + 1 < len(self.entries) else len(self.instructions)
+            self.generate_block(start, end)
+
+        source = '\n'.join(self.lines) + '\n'
+        code = CodeGenerator.code_cache.get(source)
+        if code is None:
+            code = compile(source, '<IPPcode22>', 'exec')
+            if len(CodeGenerator.code_cache) >= CodeGenerator.code_cache_size:
+                del CodeGenerator.code_cache[next(iter(CodeGenerator.code_cache))]
+            CodeGenerator.code_cache[source] = code
+
+        exec(code, self.namespace)
+        blocks = {start: self.namespace[f'b{start}'] for start in self.entries}
+        blocks[len(self.instructions)] = None
+        self.namespace['B'] = blocks
+        return blocks[0] if self.instructions else None
+
+    # Positions where the execution can continue from another place: the first instruction, instructions after jumps
+    # and calls (a jump continues after its label) and instructions after the ones which end a basic block
+    def find_entries(self) -> list:
+        entries = {0}
+        for pos, i in enumerate(self.instructions):
+            if i.target is not None:
+                entries.add(i.target + 1)
+            if i.opcode in ControlFlowGraph.terminators:
+                entries.add(pos + 1)
+
+        return sorted(e for e in entries if e < len(self.instructions))
+
+    # Returns the name of the object in the namespace of the generated code
+    def name(self, obj) -> str:
+        key = id(obj)
+        if key not in self.names:
+            self.names[key] = f'k{len(self.names)}'
+            self.namespace[self.names[key]] = obj
+
+        return self.names[key]
+
+    def block_name(self, pos: int) -> str:
+        return f'b{pos}' if pos < len(self.instructions) else 'None'
+
+    def generate_block(self, start: int, end: int):
+        body = []
+        stats_keys = []
+        insts = 0
+        exit_line = f'return {self.block_name(end)}'
+
+        for pos in range(start, end):
+            i = self.instructions[pos]
+            if hasattr(i, 'stats_keys'):
+                stats_keys.extend(i.stats_keys)
+                insts += i.insts_count
+                if len(i.parts) > 1:
+                    self.gen_parts(pos, i, body)
+                    continue
+                # Superinstructions made of one instruction are generated as the original one
+                source = i.parts[0]
+            else:
+                stats_keys.append(i.stats_key)
+                insts += 1 if i.counts_as_inst else 0
+                source = i
+
+            generator = getattr(self, 'gen_' + source.opcode.lower(), None)
+            if generator is None or not generator(pos, source, body):
+                exit_line = self.gen_handler(pos, i, body) or exit_line
+            elif source.opcode in ControlFlowGraph.terminators:
+                exit_line = body.pop()
+
+        self.lines.append(f'def b{start}(ctx):')
+        self.lines.append('    G = ctx.GF.cells')
+        self.lines.append('    p = ' + str(start))
+        self.lines.append('    try:')
+        self.lines.extend('        ' + line for line in body or ['pass'])
+        self.lines.append('    except InterpretError:')
+        self.lines.append('        ctx.current_pos = p')
+        self.lines.append('        raise')
+        self.lines.append('    h = ctx.stats.hot')
+        for key in stats_keys:
+            key_name = self.name(key)
+            self.lines.append(f'    h[{key_name}] = h.get({key_name}, 0) + 1')
+        if insts:
+            self.lines.append(f'    ctx.stats.insts += {insts}')
+        self.lines.append('    ' + exit_line)
+        self.lines.append('')
+
+    # Generates the parts of a superinstruction one after another, the statistics are counted by its stats_keys.
+    # Fused sequences don't contain instructions which end a block. Errors are reported with the order of the part.
+    def gen_parts(self, pos: int, i, body: list):
+        body.append('try:')
+        for part in i.parts:
+            part_body = [f'o = {part.order}']
+            generator = getattr(self, 'gen_' + part.opcode.lower(), None)
+            if generator is None or not generator(pos, part, part_body):
+                self.gen_handler(pos, part, part_body)
+            body.extend('    ' + line for line in part_body)
+        body.append('except InterpretError as e:')
+        body.append('    e.order = o')
+        body.append('    raise')
+
+    # Calls the handler of the instruction, returns the exit of the block for instructions which end it
+    def gen_handler(self, pos: int, i, body: list) -> str or None:
+        # The handler is looked up on every execution, because instructions can replace it (see quicken())
+        if hasattr(i, 'parts') and len(i.parts) == 1:
+            i = i.parts[0]
+        handler = self.name(i) + '.handler'
+        if i.opcode not in ControlFlowGraph.terminators:
+            body.append(f'p = {pos}')
+            body.append(f'{handler}(ctx)')
+            return None
+
+        body.append(f'p = ctx.current_pos = {pos}')
+        body.append(f'{handler}(ctx)')
+        return 'return B[ctx.current_pos + 1]'
+
+    # Reads the operand to the local variable, returns expressions with its type and its value
+    def read(self, arg, var: str, body: list) -> tuple:
+        if arg.frame is None:
+            return repr(arg.constant.type), self.name(arg.constant.value)
+
+        if arg.frame == 'GF':
+            body.append(f'{var} = G[{arg.slot}]')
+            body.append(f'if {var} is None or {var}.type is None:')
+            body.append(f'    ctx.get_variable({self.name(arg)})')
+        else:
+            body.append(f'{var} = ctx.get_variable({self.name(arg)})')
+
+        return f'{var}.type', f'{var}.value'
+
+    # Stores the result to the variable, global variables are updated directly
+    def write(self, arg, var_type: str, value: str, body: list):
+        body.append(f'r = {value}')
+        if arg.frame != 'GF':
+            body.append(f'ctx.set_variable({self.name(arg)}, {var_type}, r)')
+            return
+
+        body.append(f'd = G[{arg.slot}]')
+        body.append('if d is None or (d.type is None and ctx.track_vars):')
+        body.append(f'    ctx.set_variable({self.name(arg)}, {var_type}, r)')
+        body.append('else:')
+        body.append(f'    d.type = {var_type}')
+        body.append('    d.value = r')
+
+    # Generators of instructions return False, if the instruction must be executed by its handler.
+    # Instructions ending the block append the exit of the block as the last line.
+    def gen_label(self, pos: int, i, body: list) -> bool:
+        return True
+
+    def gen_move(self, pos: int, i, body: list) -> bool:
+        body.append(f'p = {pos}')
+        var_type, value = self.read(i.args[1], 'a', body)
+        if i.args[1].frame is not None:
+            # The buffer of SETCHAR is shared by both variables now (see CharBuffer)
+            body.append(f'if {value}.__class__ is CharBuffer:')
+            body.append(f'    {value}.shared = True')
+        self.write(i.args[0], var_type, value, body)
+        return True
+
+    def gen_arithmetics(self, pos: int, i, body: list) -> bool:
+        if not i.types_checked:
+            return False
+
+        body.append(f'p = {pos}')
+        var_type, value1 = self.read(i.args[1], 'a', body)
+        _, value2 = self.read(i.args[2], 'b', body)
+        if i.opcode in ('IDIV', 'DIV'):
+            body.append(f'if {value2} == 0:')
+            body.append(f'    {self.name(i.handler)}(ctx)')
+        self.write(i.args[0], var_type, f'{value1} {CodeGenerator.arithmetic_operators[i.opcode]} {value2}', body)
+        return True
+
+    gen_add = gen_sub = gen_mul = gen_idiv = gen_div = gen_arithmetics
+
+    def gen_logic(self, pos: int, i, body: list) -> bool:
+        if not i.types_checked:
+            return False
+
+        body.append(f'p = {pos}')
+        _, value1 = self.read(i.args[1], 'a', body)
+        _, value2 = self.read(i.args[2], 'b', body)
+        self.write(i.args[0], "'bool'", f'{value1} {CodeGenerator.logic_operators[i.opcode]} {value2}', body)
+        return True
+
+    gen_lt = gen_gt = gen_eq = gen_and = gen_or = gen_logic
+
+    def gen_not(self, pos: int, i, body: list) -> bool:
+        if not i.types_checked:
+            return False
+
+        body.append(f'p = {pos}')
+        _, value = self.read(i.args[1], 'a', body)
+        self.write(i.args[0], "'bool'", f'not {value}', body)
+        return True
+
+    def gen_write(self, pos: int, i, body: list) -> bool:
+        if not i.types_checked:
+            return False
+
+        arg = i.args[0]
+        if arg.frame is None:
+            if arg.constant.type != 'nil':
+                body.append(f'ctx.output.write({self.name(arg.constant.str_value())})')
+            return True
+
+        body.append(f'p = {pos}')
+        var_type, _ = self.read(arg, 'a', body)
+        body.append(f"if {var_type} != 'nil':")
+        body.append('    ctx.output.write(a.str_value())')
+        return True
+
+    def gen_jump(self, pos: int, i, body: list) -> bool:
+        body.append(f'return {self.block_name(i.target + 1)}')
+        return True
+
+    def gen_conditional_jump(self, pos: int, i, body: list) -> bool:
+        if not i.types_checked:
+            return False
+
+        body.append(f'p = {pos}')
+        _, value1 = self.read(i.args[1], 'a', body)
+        _, value2 = self.read(i.args[2], 'b', body)
+        body.append(f'c = {value1} {"==" if i.opcode == "JUMPIFEQ" else "!="} {value2}')
+        body.append(f'return {self.block_name(i.target + 1)} if c else {self.block_name(pos + 1)}')
+        return True
+
+    gen_jumpifeq = gen_jumpifneq = gen_conditional_jump
+
+    def gen_call(self, pos: int, i, body: list) -> bool:
+        body.append(f'ctx.calls.append({pos})')
+        body.append(f'return {self.block_name(i.target + 1)}')
+        return True
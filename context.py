@@ -1,181 +1,232 @@
-import sys
+import time
 
-from exit_code import ExitCode
+from data_stack import DataStack
+from exit_code import ExitCode, InterpretError, ProgramExit
+from frame import Frame
+from limits import Limits
 from variable import Variable
 from argument import Argument
+from output_buffer import OutputBuffer
 from stats import Stats
 
 
 class Context:
-    instructions = list()
-    GF = dict()
-    LFs = list()
-    labels = dict()
-    calls = list()
-    stack = list()
-    stats = Stats()
-
-    def __init__(self, input_stream):
-        self.current_pos = 0
+    frame_names = {'GF': 'global', 'LF': 'local', 'TF': 'temporary'}
+
+    def __init__(self, program, input_stream, output, error_output, track_vars: bool = False,
+                 line_buffered: bool = False, profile=None, limits: Limits = None):
+        self.instructions = program.instructions
+        self.code = program.code
+        self.tracer = program.tracer
+        # Profile which observes the run (see Profile), it is used instead of the compiled code and the tracer
+        self.profile = profile
+        self.GF = Frame(program.globals)
+        self.LFs = list()
         self.TF = None
+        # Cleared frames keyed by the id of their layout (every CREATEFRAME has its own layout)
+        self.frame_pool = dict()
+        self.calls = list()
+        self.stack = DataStack()
+        self.stats = Stats()
+        self.current_pos = 0
         self.input = input_stream
-
-    def execute(self):
-        while self.current_pos != len(self.instructions):
-            self.instructions[self.current_pos].execute(self)
-            self.update_stats_vars()
-            self.current_pos += 1
-
-    def update_stats_vars(self):
-        count = Context.__init_vars_count(self.GF)
-        if self.TF is not None:
-            count += Context.__init_vars_count(self.TF)
-        for LF in self.LFs:
-            count += Context.__init_vars_count(LF)
-
-        if count > self.stats.vars:
-            self.stats.vars = count
+        self.output = OutputBuffer(output, line_buffered)
+        self.error_output = error_output
+        self.track_vars = track_vars
+        self.vars_count = 0
+        self.finished = False
+        # Limits of the run (see check_limits()), the run is stopped with partial statistics when one is exceeded
+        self.limits = limits
+        self.limit_exceeded = False
+        self.deadline = None if limits is None or limits.timeout is None else time.monotonic() + limits.timeout
+        self.time_countdown = Limits.time_check_interval
+
+    # Runs the program and returns its exit code, runtime errors are printed to the error output
+    def execute(self) -> int:
+        instructions = self.instructions
+        try:
+            if self.profile is not None:
+                self.profile.run(self)
+            elif self.code is not None:
+                # Compiled program (see CodeGenerator), every block returns the next one
+                block = self.code
+                if self.limits is None:
+                    while block is not None:
+                        block = block(self)
+                else:
+                    while block is not None:
+                        block = block(self)
+                        if block is not None:
+                            self.check_limits()
+            elif self.tracer is not None:
+                self.tracer.run(self)
+            elif self.limits is None:
+                while self.current_pos != len(instructions):
+                    instruction = instructions[self.current_pos]
+                    instruction.handler(self)
+                    instruction.update_stats(self)
+                    self.current_pos += 1
+            else:
+                while self.current_pos != len(instructions):
+                    pos = self.current_pos
+                    instruction = instructions[pos]
+                    instruction.handler(self)
+                    instruction.update_stats(self)
+                    self.current_pos += 1
+                    if self.current_pos <= pos:
+                        self.check_limits()
+        except InterpretError as e:
+            self.output.flush()
+            self.limit_exceeded = e.code is ExitCode.LIMIT_EXCEEDED
+            # Limits are checked between instructions, the error does not belong to any of them
+            self.error(e.message, no_instruction=self.limit_exceeded, order=e.order)
+            return e.code.value
+        except ProgramExit as e:
+            return e.code
+        finally:
+            self.output.flush()
+
+        self.finished = True
+        return ExitCode.OK.value
+
+    # Is called when the execution goes back (and after every block of compiled code), if the run has limits
+    def check_limits(self):
+        limits = self.limits
+        if limits.max_insts is not None and self.stats.insts > limits.max_insts:
+            raise InterpretError(ExitCode.LIMIT_EXCEEDED,
+                                 f'limit of executed instructions ({limits.max_insts}) was exceeded.')
+        if limits.max_stack is not None and len(self.stack) > limits.max_stack:
+            raise InterpretError(ExitCode.LIMIT_EXCEEDED,
+                                 f'limit of the data stack size ({limits.max_stack}) was exceeded.')
+        if limits.max_call_depth is not None and len(self.calls) > limits.max_call_depth:
+            raise InterpretError(ExitCode.LIMIT_EXCEEDED,
+                                 f'limit of the call depth ({limits.max_call_depth}) was exceeded.')
+
+        if self.deadline is not None:
+            self.time_countdown -= 1
+            if self.time_countdown == 0:
+                self.time_countdown = Limits.time_check_interval
+                if time.monotonic() > self.deadline:
+                    raise InterpretError(ExitCode.LIMIT_EXCEEDED, f'time limit ({limits.timeout} s) was exceeded.')
+
+    # Is called when a declared variable gets its first value
+    def count_initialized_var(self):
+        self.vars_count += 1
+        if self.vars_count > self.stats.vars:
+            self.stats.vars = self.vars_count
+
+    # Is called when a frame is thrown away (CREATEFRAME or POPFRAME replaces the temporary frame). Nothing else
+    # refers to the frame and its variables then, so it is cleared and kept for the next frame with the same layout.
+    def drop_frame(self, frame: Frame or None):
+        if frame is None:
+            return
+
+        if self.track_vars:
+            self.vars_count -= Context.__init_vars_count(frame)
+        frame.clear()
+        self.frame_pool.setdefault(id(frame.layout), []).append(frame)
+
+    # Returns an empty frame with the layout, frames thrown away by drop_frame() are used again
+    def new_frame(self, layout: dict) -> Frame:
+        pool = self.frame_pool.get(id(layout))
+        return pool.pop() if pool else Frame(layout)
 
     @staticmethod
-    def __init_vars_count(frame: dict) -> int:
+    def __init_vars_count(frame: Frame) -> int:
         res = 0
-        for var in frame.values():
-            if var.type is not None and var.value is not None:
+        for _, var in frame.items():
+            if var.type is not None:
                 res += 1
         return res
 
-
-    def load_labels(self):
-        for i in self.instructions:
-            if i.opcode == 'LABEL':
-                if i.args[0].value in self.labels.keys():
-                    self.error(f'label {i.args[0].value} is defined twice.', True)
-                    exit(ExitCode.SEMANTIC_ERROR.value)
-
-                self.labels[i.args[0].value] = int(i.order)
-
-    def error(self, message: str, no_instruction: bool = False):
+    def error(self, message: str, no_instruction: bool = False, order: int = None):
         if not no_instruction:
-            print(f'ERROR (instruction #{self.current_pos + 1}): {message}', file=sys.stderr)
+            if order is None:
+                order = self.instructions[self.current_pos].order
+            print(f'ERROR (instruction #{order}): {message}', file=self.error_output)
         else:
-            print(f'ERROR: {message}', file=sys.stderr)
+            print(f'ERROR: {message}', file=self.error_output)
 
-    def get_variable(self, frame: str, name: str) -> Variable:
-        if frame == 'GF':
-            if name not in self.GF.keys():
-                self.error(f'variable {name} is not defined in the global frame.')
-                exit(ExitCode.UNDEFINED_VARIABLE.value)
-
-            if self.GF[name].type is None:
-                self.error(f'variable {name} is declared but undefined.')
-                exit(ExitCode.MISSING_VALUE.value)
-
-            return self.GF[name]
-        elif frame == 'LF':
+    def get_frame(self, arg: Argument) -> Frame:
+        if arg.frame == 'GF':
+            return self.GF
+        elif arg.frame == 'LF':
             if len(self.LFs) == 0:
-                self.error('local frame does not exist.')
-                exit(ExitCode.UNDEFINED_FRAME.value)
-
-            if name not in self.LFs[-1].keys():
-                self.error(f'variable {name} is not defined in the local frame.')
-                exit(ExitCode.UNDEFINED_VARIABLE.value)
-
-            if self.LFs[-1][name].type is None:
-                self.error(f'variable {name} is declared but undefined.')
-                exit(ExitCode.MISSING_VALUE.value)
+                raise InterpretError(ExitCode.UNDEFINED_FRAME, 'local frame does not exist.')
 
-            return self.LFs[-1][name]
-        elif frame == 'TF':
+            return self.LFs[-1]
+        elif arg.frame == 'TF':
             if self.TF is None:
-                self.error(f'temporary frame is not defined.')
-                exit(ExitCode.UNDEFINED_FRAME.value)
+                raise InterpretError(ExitCode.UNDEFINED_FRAME, 'temporary frame is not defined.')
 
-            if name not in self.TF.keys():
-                self.error(f'variable {name} is not defined in the temporary frame.')
-                exit(ExitCode.UNDEFINED_VARIABLE.value)
+            return self.TF
 
-            if self.TF[name].type is None:
-                self.error(f'variable {name} is declared but is not defined.')
-                exit(ExitCode.MISSING_VALUE.value)
+        raise InterpretError(ExitCode.UNEXPECTED_XML_STRUCTURE, f'unknown frame {arg.frame}.')
 
-            return self.TF[name]
-
-    def get_variable_from_arg(self, arg: Argument) -> Variable:
-        var = Variable(None, None)
-        if arg.type == 'var':
-            sym_data = arg.value.split('@')
-            sym = self.get_variable(sym_data[0], sym_data[1])
-            var.type = sym.type
-            var.value = sym.value
+    # Returns the variable from the frame or None, if it is not defined. The index of the variable is
+    # cached in the argument and used while the frame has the same layout.
+    def find_variable(self, arg: Argument) -> Variable or None:
+        frame = self.get_frame(arg)
+        if frame.layout is arg.layout:
+            slot = arg.slot
         else:
-            var.type = arg.type
-            var.value = arg.value
+            slot = frame.layout.get(arg.name)
+            if slot is None:
+                return None
 
-        return var
+            arg.layout = frame.layout
+            arg.slot = slot
 
+        cells = frame.cells
+        return cells[slot] if slot < len(cells) else None
 
-    def def_var(self, frame: str, name: str):
-        var = Variable(None, None)
+    # Returns the type of the operand or None, if the variable can't be read (the instruction reports the error)
+    def type_of(self, arg: Argument) -> str or None:
+        if arg.frame is None:
+            return arg.constant.type
 
-        if frame == 'GF':
-            if name in self.GF.keys():
-                self.error(f'variable {name} is already defined in the global frame.')
-                exit(ExitCode.SEMANTIC_ERROR.value)
-            self.GF[name] = var
-        elif frame == 'LF':
-            if len(self.LFs) == 0:
-                self.error('local frame does not exist.')
-                exit(ExitCode.UNDEFINED_FRAME.value)
-
-            if name in self.LFs[-1].keys():
-                self.error(f'variable {name} is already defined in the local frame.')
-                exit(ExitCode.SEMANTIC_ERROR.value)
-
-            self.LFs[-1][name] = var
-        elif frame == 'TF':
-            if self.TF is None:
-                self.error(f'temporary frame is not defined.')
-                exit(ExitCode.UNDEFINED_FRAME.value)
-
-            if name in self.TF.keys():
-                self.error(f'variable {name} is already defined in the temporary frame.')
-                exit(ExitCode.SEMANTIC_ERROR.value)
-
-            self.TF[name] = var
-
-    def set_variable(self, frame: str, name: str, var_type, value):
-        var = Variable(var_type, value)
+        try:
+            var = self.find_variable(arg)
+        except InterpretError:
+            return None
 
-        if frame == 'GF':
-            if name not in self.GF.keys():
-                self.error(f'variable {name} is not defined in the global frame.')
-                exit(ExitCode.UNDEFINED_VARIABLE.value)
+        return None if var is None else var.type
 
-            self.GF[name] = var
-        elif frame == 'LF':
-            if len(self.LFs) == 0:
-                self.error('local frame does not exist.')
-                exit(ExitCode.UNDEFINED_FRAME.value)
-
-            if name not in self.LFs[-1].keys():
-                self.error(f'variable {name} is not defined in the local frame.')
-                exit(ExitCode.UNDEFINED_VARIABLE.value)
-
-            self.LFs[-1][name] = var
-        elif frame == 'TF':
-            if self.TF is None:
-                self.error(f'temporary frame is not defined.')
-                exit(ExitCode.UNDEFINED_FRAME.value)
+    def get_variable(self, arg: Argument) -> Variable:
+        var = self.find_variable(arg)
+        if var is None:
+            raise InterpretError(ExitCode.UNDEFINED_VARIABLE,
+                                 f'variable {arg.name} is not defined in the {Context.frame_names[arg.frame]} frame.')
 
-            if name not in self.TF.keys():
-                self.error(f'variable {name} is not defined in the temporary frame.')
-                exit(ExitCode.UNDEFINED_VARIABLE.value)
+        if var.type is None:
+            raise InterpretError(ExitCode.MISSING_VALUE, f'variable {arg.name} is declared but undefined.')
 
-            self.TF[name] = var
-
-    def jump_to_label(self, label: str):
-        if label not in self.labels.keys():
-            self.error(f'label {label} does not exist.')
-            exit(ExitCode.SEMANTIC_ERROR.value)
+        return var
 
-        self.current_pos = self.labels[label] - 1
+    def get_variable_from_arg(self, arg: Argument) -> Variable:
+        if arg.frame is not None:
+            return self.get_variable(arg)
+
+        return arg.constant
+
+    def def_var(self, arg: Argument):
+        frame = self.get_frame(arg)
+        slot = frame.define(arg.name)
+        if slot is None:
+            raise InterpretError(ExitCode.SEMANTIC_ERROR,
+                                 f'variable {arg.name} is already defined in the {Context.frame_names[arg.frame]} frame.')
+
+        arg.layout = frame.layout
+        arg.slot = slot
+
+    # Updates the variable in place, values of variables are never shared (see PUSHS and CharBuffer)
+    def set_variable(self, arg: Argument, var_type, value):
+        var = self.find_variable(arg)
+        if var is None:
+            raise InterpretError(ExitCode.UNDEFINED_VARIABLE,
+                                 f'variable {arg.name} is not defined in the {Context.frame_names[arg.frame]} frame.')
+
+        if self.track_vars and var.type is None:
+            self.count_initialized_var()
+        var.type = var_type
+        var.value = value
@@ -0,0 +1,29 @@
+from variable import Variable
+
+
+# Data stack of the STACK extension. Type tags and values are stored in two parallel lists, so stack instructions
+# work with the native values and don't allocate a Variable for every pushed value. Instructions access the lists
+# directly, push() and pop() are used where a Variable is needed (type errors, POPS, BREAK).
+class DataStack:
+    __slots__ = ('types', 'values')
+
+    def __init__(self):
+        self.types = []
+        self.values = []
+
+    def __len__(self):
+        return len(self.types)
+
+    def __iter__(self):
+        return (Variable(var_type, value) for var_type, value in zip(self.types, self.values))
+
+    def push(self, var_type: str, value):
+        self.types.append(var_type)
+        self.values.append(value)
+
+    def pop(self) -> Variable:
+        return Variable(self.types.pop(), self.values.pop())
+
+    def clear(self):
+        self.types.clear()
+        self.values.clear()
@@ -0,0 +1,104 @@
+import json
+
+from context import Context
+from instruction import Instruction
+
+
+# Execution profile of a program (--profile-out, --profile-in). For every instruction (keyed by its order) it stores
+# the number of executions, the observed types of operands of instructions which can be quickened and the number
+# of taken jumps. The profile belongs to one source, it is identified by the SHA-256 of the source.
+class Profile:
+    version = 1
+
+    def __init__(self, source_hash: str):
+        self.source_hash = source_hash
+        self.counts = dict()
+        self.types = dict()
+        self.taken = dict()
+
+    # Executes the program like Context.execute() and observes the operands and jumps
+    def run(self, ctx: Context):
+        instructions = ctx.instructions
+        types = self.types
+        taken = self.taken
+        while ctx.current_pos != len(instructions):
+            pos = ctx.current_pos
+            instruction = instructions[pos]
+            if instruction.opcode in Instruction.quickened_types and not hasattr(instruction, 'parts'):
+                observed = types.setdefault(instruction.order, dict())
+                key = ' '.join(str(ctx.type_of(arg)) for arg in instruction.args[1:3])
+                observed[key] = observed.get(key, 0) + 1
+
+            instruction.handler(ctx)
+            instruction.update_stats(ctx)
+
+            if instruction.target is not None and ctx.current_pos != pos:
+                taken[instruction.order] = taken.get(instruction.order, 0) + 1
+            ctx.current_pos += 1
+            if ctx.current_pos <= pos and ctx.limits is not None:
+                ctx.check_limits()
+
+    # Adds the execution counts from the statistics of the finished run
+    def add_counts(self, hot: dict):
+        for (_, order), count in hot.items():
+            self.counts[order] = self.counts.get(order, 0) + count
+
+    def count(self, order: int) -> int:
+        return self.counts.get(order, 0)
+
+    def taken_count(self, order: int) -> int:
+        return self.taken.get(order, 0)
+
+    # Returns the type of both operands, if the instruction always had operands of the same type, otherwise None
+    def monomorphic_type(self, order: int) -> str or None:
+        observed = self.types.get(order)
+        if observed is None or len(observed) != 1:
+            return None
+
+        types = next(iter(observed)).split(' ')
+        return types[0] if len(types) == 2 and types[0] == types[1] else None
+
+    # Checks that the profile belongs to the loaded instructions of the program: every order is an order of an
+    # instruction, types are observed only for instructions which can be quickened and jumps only for instructions
+    # with a target
+    def matches(self, instructions: list) -> bool:
+        by_order = {i.order: i for i in instructions}
+        if not (set(self.counts) | set(self.types) | set(self.taken)) <= set(by_order):
+            return False
+
+        return all(by_order[order].opcode in Instruction.quickened_types for order, observed in self.types.items()
+                   if observed) \
+            and all(by_order[order].target is not None for order, count in self.taken.items() if count)
+
+    def save(self, path: str):
+        instructions = dict()
+        for order in sorted(set(self.counts) | set(self.types) | set(self.taken)):
+            instructions[str(order)] = {
+                'count': self.count(order),
+                'types': self.types.get(order, dict()),
+                'taken': self.taken_count(order),
+            }
+
+        with open(path, 'w', encoding='utf8') as f:
+            json.dump({'version': Profile.version, 'source': self.source_hash, 'instructions': instructions}, f,
+                      indent=1)
+
+    # Loads the profile from the file, returns None if the file is not a valid profile
+    @staticmethod
+    def load(path: str) -> 'Profile' or None:
+        with open(path, encoding='utf8') as f:
+            try:
+                data = json.load(f)
+                if data.get('version') != Profile.version:
+                    return None
+
+                profile = Profile(data['source'])
+                for order, record in data['instructions'].items():
+                    order = int(order)
+                    profile.counts[order] = int(record['count'])
+                    profile.types[order] = {str(k): int(v) for k, v in record['types'].items()}
+                    profile.taken[order] = int(record['taken'])
+            except (ValueError, KeyError, TypeError, AttributeError):
+                return None
+
+        return profile
@@ -14,4 +14,21 @@ class ExitCode(Enum):
     MISSING_VALUE = 56
     BAD_OPERAND_VALUE = 57
     BAD_STRING_OPERATION = 58
+    LIMIT_EXCEEDED = 60
     INTERNAL_ERROR = 99
+
+
+class InterpretError(Exception):
+    def __init__(self, code: ExitCode, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        # Order of the instruction which caused the error, if it differs from the executed one (superinstructions)
+        self.order = None
+
+
+# Is raised by the EXIT instruction to stop the program with the specified code
+class ProgramExit(Exception):
+    def __init__(self, code: int):
+        super().__init__(code)
+        self.code = code
@@ -0,0 +1,44 @@
+from variable import Variable
+
+
+# Frame with variables stored in a list. The layout maps names to indices of the list and is shared by all
+# frames created at the same place (the global frame or one CREATEFRAME instruction), so arguments can cache
+# the index for the layout and access the variable without looking up its name.
+class Frame:
+    __slots__ = ('layout', 'cells', 'spare')
+
+    def __init__(self, layout: dict):
+        self.layout = layout
+        self.cells = [None] * len(layout)
+        # Variables of the previous use of the frame, they are reused by DEFVAR (see Context.new_frame())
+        self.spare = []
+
+    # Returns the index of a new variable or None, if it is already defined
+    def define(self, name: str) -> int or None:
+        slot = self.layout.setdefault(name, len(self.layout))
+        if slot >= len(self.cells):
+            self.cells.extend([None] * (len(self.layout) - len(self.cells)))
+        elif self.cells[slot] is not None:
+            return None
+
+        if self.spare:
+            var = self.spare.pop()
+            var.type = None
+            var.value = None
+        else:
+            var = Variable(None, None)
+        self.cells[slot] = var
+        return slot
+
+    # Removes all variables, so the frame can be used again as a new frame with the same layout
+    def clear(self):
+        self.spare.extend(filter(None, self.cells))
+        self.cells = [None] * len(self.cells)
+
+    def items(self):
+        for name, slot in self.layout.items():
+            if slot < len(self.cells) and self.cells[slot] is not None:
+                yield name, self.cells[slot]
+
+    def __len__(self):
+        return len(self.cells) - self.cells.count(None)
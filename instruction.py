@@ -1,163 +1,220 @@
-import sys
-
 from argument import Argument
+from char_buffer import CharBuffer
 from context import Context
-from exit_code import ExitCode
+from exit_code import ExitCode, InterpretError, ProgramExit
 from logic import LogicType, LogicEvaluator
+from rope import Rope
 from type_checker import TypeChecker
 from variable import Variable
 from arithmetics import ArithmeticEvaluator, ArithmeticsType
 
 
 class Instruction:
+    handlers = {
+        'MOVE': 'move',
+        'CREATEFRAME': 'createframe',
+        'PUSHFRAME': 'pushframe',
+        'POPFRAME': 'popframe',
+        'DEFVAR': 'defvar',
+        'CALL': 'call',
+        'RETURN': 'exec_return',
+        'PUSHS': 'pushs',
+        'POPS': 'pops',
+        'CLEARS': 'clears',
+        'ADDS': 'adds',
+        'SUBS': 'subs',
+        'MULS': 'muls',
+        'IDIVS': 'idivs',
+        'LTS': 'lts',
+        'GTS': 'gts',
+        'EQS': 'eqs',
+        'ANDS': 'ands',
+        'ORS': 'ors',
+        'NOTS': 'nots',
+        'INT2CHARS': 'int2chars',
+        'STRI2INTS': 'stri2ints',
+        'JUMPIFEQS': 'jumpifeqs',
+        'JUMPIFNEQS': 'jumpifneqs',
+        'INT2FLOAT': 'int2float',
+        'FLOAT2INT': 'float2int',
+        'ADD': 'add',
+        'SUB': 'sub',
+        'MUL': 'mul',
+        'IDIV': 'idiv',
+        'DIV': 'div',
+        'LT': 'lt',
+        'GT': 'gt',
+        'EQ': 'eq',
+        'AND': 'exec_and',
+        'OR': 'exec_or',
+        'NOT': 'exec_not',
+        'INT2CHAR': 'int2char',
+        'STRI2INT': 'stri2int',
+        'READ': 'read',
+        'WRITE': 'write',
+        'CONCAT': 'concat',
+        'STRLEN': 'strlen',
+        'GETCHAR': 'getchar',
+        'SETCHAR': 'setchar',
+        'TYPE': 'type',
+        'LABEL': 'label',
+        'JUMP': 'jump',
+        'JUMPIFEQ': 'jumpifeq',
+        'JUMPIFNEQ': 'jumpifneq',
+        'EXIT': 'exit',
+        'DPRINT': 'dprint',
+        'BREAK': 'exec_break',
+    }
+
+    jumps = ('JUMP', 'JUMPIFEQ', 'JUMPIFNEQ', 'JUMPIFEQS', 'JUMPIFNEQS', 'CALL')
+
+    # Operand types for which the instruction can be quickened (both operands must have the same type)
+    quickened_types = {
+        'ADD': ('int', 'float'),
+        'SUB': ('int', 'float'),
+        'MUL': ('int', 'float'),
+        'IDIV': ('int', 'float'),
+        'DIV': ('float',),
+        'LT': ('int', 'float', 'string', 'bool'),
+        'GT': ('int', 'float', 'string', 'bool'),
+        'EQ': ('int', 'float', 'string', 'bool', 'nil'),
+        'AND': ('bool',),
+        'OR': ('bool',),
+        'JUMPIFEQ': ('int', 'float', 'string', 'bool', 'nil'),
+        'JUMPIFNEQ': ('int', 'float', 'string', 'bool', 'nil'),
+    }
+    # Number of executions with the same operand types after which the instruction is quickened
+    quicken_threshold = 8
+    # Number of deoptimizations after which the instruction stays generic
+    max_deoptimizations = 4
+
     def __init__(self, opcode: str, order: int):
         self.opcode = opcode
         self.order = order
         self.args = []
+        self.handler = None
+        self.stats_key = None
+        self.counts_as_inst = True
+        self.target = None
+        self.layout = None
+        self.types_checked = False
+        self.quick_type = None
+        self.quick_count = 0
+        self.quick_operation = None
+        self.deoptimizations = 0
 
     def add_arg(self, arg: Argument):
         self.args.append(arg)
 
-    def execute(self, ctx: Context):
-        if self.opcode == "MOVE":
-            self.move(ctx)
-        elif self.opcode == "CREATEFRAME":
-            self.createframe(ctx)
-        elif self.opcode == "PUSHFRAME":
-            self.pushframe(ctx)
-        elif self.opcode == "POPFRAME":
-            self.popframe(ctx)
-        elif self.opcode == "DEFVAR":
-            self.defvar(ctx)
-        elif self.opcode == "CALL":
-            self.call(ctx)
-        elif self.opcode == "RETURN":
-            self.exec_return(ctx)
-        elif self.opcode == "PUSHS":
-            self.pushs(ctx)
-        elif self.opcode == "POPS":
-            self.pops(ctx)
-        elif self.opcode == "CLEARS":
-            self.clears(ctx)
-        elif self.opcode == "ADDS":
-            self.adds(ctx)
-        elif self.opcode == "SUBS":
-            self.subs(ctx)
-        elif self.opcode == "MULS":
-            self.muls(ctx)
-        elif self.opcode == "IDIVS":
-            self.idivs(ctx)
-        elif self.opcode == "LTS":
-            self.lts(ctx)
-        elif self.opcode == "GTS":
-            self.gts(ctx)
-        elif self.opcode == "EQS":
-            self.eqs(ctx)
-        elif self.opcode == "ANDS":
-            self.ands(ctx)
-        elif self.opcode == "ORS":
-            self.ors(ctx)
-        elif self.opcode == "NOTS":
-            self.nots(ctx)
-        elif self.opcode == "INT2CHARS":
-            self.int2chars(ctx)
-        elif self.opcode == "STRI2INTS":
-            self.stri2ints(ctx)
-        elif self.opcode == "JUMPIFEQS":
-            self.jumpifeqs(ctx)
-        elif self.opcode == "JUMPIFNEQS":
-            self.jumpifneqs(ctx)
-        elif self.opcode == 'INT2FLOAT':
-            self.int2float(ctx)
-        elif self.opcode == 'FLOAT2INT':
-            self.float2int(ctx)
-        elif self.opcode == "ADD":
-            self.add(ctx)
-        elif self.opcode == "SUB":
-            self.sub(ctx)
-        elif self.opcode == "MUL":
-            self.mul(ctx)
-        elif self.opcode == "IDIV":
-            self.idiv(ctx)
-        elif self.opcode == "DIV":
-            self.div(ctx)
-        elif self.opcode == "LT":
-            self.lt(ctx)
-        elif self.opcode == "GT":
-            self.gt(ctx)
-        elif self.opcode == "EQ":
-            self.eq(ctx)
-        elif self.opcode == "AND":
-            self.exec_and(ctx)
-        elif self.opcode == "OR":
-            self.exec_or(ctx)
-        elif self.opcode == "NOT":
-            self.exec_not(ctx)
-        elif self.opcode == "INT2CHAR":
-            self.int2char(ctx)
-        elif self.opcode == "STRI2INT":
-            self.stri2int(ctx)
-        elif self.opcode == "READ":
-            self.read(ctx)
-        elif self.opcode == "WRITE":
-            self.write(ctx)
-        elif self.opcode == "CONCAT":
-            self.concat(ctx)
-        elif self.opcode == "STRLEN":
-            self.strlen(ctx)
-        elif self.opcode == "GETCHAR":
-            self.getchar(ctx)
-        elif self.opcode == "SETCHAR":
-            self.setchar(ctx)
-        elif self.opcode == "TYPE":
-            self.type(ctx)
-        elif self.opcode == "LABEL":
-            self.label(ctx)
-        elif self.opcode == "JUMP":
-            self.jump(ctx)
-        elif self.opcode == "JUMPIFEQ":
-            self.jumpifeq(ctx)
-        elif self.opcode == "JUMPIFNEQ":
-            self.jumpifneq(ctx)
-        elif self.opcode == "EXIT":
-            self.exit(ctx)
-        elif self.opcode == "DPRINT":
-            self.dprint(ctx)
-        elif self.opcode == "BREAK":
-            self.exec_break(ctx)
-        else:
-            ctx.error(f'unknown opcode {self.opcode}.')
-            exit(ExitCode.UNEXPECTED_XML_STRUCTURE.value)
+    def bind(self) -> bool:
+        if self.opcode not in Instruction.handlers:
+            return False
+
+        self.handler = getattr(self, Instruction.handlers[self.opcode])
+        self.stats_key = (self.opcode, self.order)
+        self.counts_as_inst = self.opcode not in ('DPRINT', 'LABEL', 'BREAK')
+        return True
+
+    # Resolves the label of a jump instruction to the position it should continue from
+    def link(self, labels: dict) -> bool:
+        if self.opcode not in Instruction.jumps:
+            return True
 
-        self.update_stats(ctx)
+        if self.args[0].value not in labels:
+            return False
+
+        self.target = labels[self.args[0].value]
+        return True
 
     def update_stats(self, ctx: Context):
-        if (self.opcode, self.order) not in ctx.stats.hot.keys():
-            ctx.stats.hot[(self.opcode, self.order)] = 0
-        ctx.stats.hot[(self.opcode, self.order)] += 1
+        hot = ctx.stats.hot
+        hot[self.stats_key] = hot.get(self.stats_key, 0) + 1
 
-        if self.opcode != 'DPRINT' and self.opcode != 'LABEL' and self.opcode != 'BREAK':
+        if self.counts_as_inst:
             ctx.stats.insts += 1
 
     # Gets a variable from its identifier in the argument and stores there the specified value
     def update_var_in_args(self, ctx: Context, type: str, value, arg_index: int = 0):
-        var_data = self.args[0].value.split('@')
-        ctx.set_variable(var_data[0], var_data[1], type, value)
+        ctx.set_variable(self.args[arg_index], type, value)
+
+    # region Quickening
+    # Generic handlers call observe() with the types of the operands. When they have the same type a few times
+    # in a row, the handler is replaced by a specialized one, which only checks that the types did not change.
+    def observe(self, type1: str, type2: str):
+        if self.deoptimizations >= Instruction.max_deoptimizations:
+            return
+
+        if type1 != type2 or type1 != self.quick_type:
+            self.quick_type = type1 if type1 == type2 else None
+            self.quick_count = 0
+
+        self.quick_count += 1
+        if self.quick_count >= Instruction.quicken_threshold and type1 in Instruction.quickened_types[self.opcode]:
+            self.quicken()
+
+    def quicken(self):
+        if self.opcode in ('JUMPIFEQ', 'JUMPIFNEQ'):
+            self.handler = self.quick_jump
+        elif self.opcode in ('ADD', 'SUB', 'MUL', 'IDIV', 'DIV'):
+            self.quick_operation = ArithmeticEvaluator.funcs[ArithmeticsType[self.opcode]]
+            self.handler = self.quick_arithmetics
+        else:
+            self.quick_operation = LogicEvaluator.funcs[LogicType[self.opcode]]
+            self.handler = self.quick_logic
+
+    # Is called by a specialized handler when the types changed, the generic handler executes the instruction
+    def deoptimize(self, ctx: Context):
+        self.deoptimizations += 1
+        self.quick_type = None
+        self.quick_count = 0
+        self.handler = getattr(self, Instruction.handlers[self.opcode])
+        self.handler(ctx)
+
+    def quick_arithmetics(self, ctx: Context):
+        sym1 = ctx.get_variable_from_arg(self.args[1])
+        sym2 = ctx.get_variable_from_arg(self.args[2])
+        if sym1.type != self.quick_type or sym2.type != self.quick_type:
+            return self.deoptimize(ctx)
+
+        if sym2.value == 0 and (self.opcode == 'IDIV' or self.opcode == 'DIV'):
+            raise InterpretError(ExitCode.BAD_OPERAND_VALUE, "you can't divide by zero =(")
+
+        ctx.set_variable(self.args[0], sym1.type, self.quick_operation(sym1.value, sym2.value))
+
+    def quick_logic(self, ctx: Context):
+        sym1 = ctx.get_variable_from_arg(self.args[1])
+        sym2 = ctx.get_variable_from_arg(self.args[2])
+        if sym1.type != self.quick_type or sym2.type != self.quick_type:
+            return self.deoptimize(ctx)
+
+        ctx.set_variable(self.args[0], 'bool', self.quick_operation(sym1.value, sym2.value))
+
+    def quick_jump(self, ctx: Context):
+        sym1 = ctx.get_variable_from_arg(self.args[1])
+        sym2 = ctx.get_variable_from_arg(self.args[2])
+        if sym1.type != self.quick_type or sym2.type != self.quick_type:
+            return self.deoptimize(ctx)
+
+        if (sym1.value == sym2.value) == (self.opcode == 'JUMPIFEQ'):
+            ctx.current_pos = self.target
+    # endregion
 
     # region Frames and variables
     def move(self, ctx: Context):
         sym = ctx.get_variable_from_arg(self.args[1])
+        if type(sym.value) is CharBuffer:
+            sym.value.shared = True
         self.update_var_in_args(ctx, sym.type, sym.value)
         return
 
     def createframe(self, ctx: Context):
-        ctx.TF = dict()
+        ctx.drop_frame(ctx.TF)
+        ctx.TF = ctx.new_frame(self.layout)
         return
 
     def pushframe(self, ctx: Context):
         if ctx.TF is None:
-            ctx.error('temporary frame is not defined.')
-            exit(ExitCode.UNDEFINED_FRAME.value)
+            raise InterpretError(ExitCode.UNDEFINED_FRAME, 'temporary frame is not defined.')
 
         ctx.LFs.append(ctx.TF)
         ctx.TF = None
@@ -165,195 +222,192 @@ class Instruction:
 
     def popframe(self, ctx: Context):
         if len(ctx.LFs) == 0:
-            ctx.error('local frame stack is empty.')
-            exit(ExitCode.UNDEFINED_FRAME.value)
+            raise InterpretError(ExitCode.UNDEFINED_FRAME, 'local frame stack is empty.')
 
+        ctx.drop_frame(ctx.TF)
         ctx.TF = ctx.LFs.pop()
         return
 
     def defvar(self, ctx: Context):
-        data = self.args[0].value.split('@')
-        ctx.def_var(data[0], data[1])
+        ctx.def_var(self.args[0])
         return
 
     def call(self, ctx: Context):
-        ctx.calls.append(self.order - 1)
-        ctx.jump_to_label(self.args[0].value)
+        ctx.calls.append(ctx.current_pos)
+        ctx.current_pos = self.target
         return
 
     def exec_return(self, ctx: Context):
         if len(ctx.calls) == 0:
-            ctx.error('call frame is empty.')
-            exit(ExitCode.MISSING_VALUE.value)
+            raise InterpretError(ExitCode.MISSING_VALUE, 'call frame is empty.')
 
         ctx.current_pos = ctx.calls.pop()
         return
     # endregion
 
     # region Stack
-    def check_stack_len(self, ctx: Context, required_stack_len: int):
-        if len(ctx.stack) < required_stack_len:
-            ctx.error(f'Stack has {len(ctx.stack)} elements but {self.opcode} requires {required_stack_len}')
-            exit(ExitCode.MISSING_VALUE.value)
+    # Stack instructions work directly with the lists of DataStack. Operands of the same expected type are evaluated
+    # in place, other operands are popped as variables and checked by the generic code, which reports the errors.
+    def stack_underflow(self, ctx: Context, required_stack_len: int) -> InterpretError:
+        return InterpretError(ExitCode.MISSING_VALUE, f'Stack has {len(ctx.stack)} elements but {self.opcode} requires {required_stack_len}')
 
     def pushs(self, ctx: Context):
         var = ctx.get_variable_from_arg(self.args[0])
+        if type(var.value) is CharBuffer:
+            var.value.shared = True
 
-        ctx.stack.append(var)
+        stack = ctx.stack
+        stack.types.append(var.type)
+        stack.values.append(var.value)
         return
 
     def pops(self, ctx: Context):
-        self.check_stack_len(ctx, 1)
-        var = ctx.stack.pop()
+        stack = ctx.stack
+        if len(stack.types) < 1:
+            raise self.stack_underflow(ctx, 1)
 
-        self.update_var_in_args(ctx, var.type, var.value)
+        self.update_var_in_args(ctx, stack.types.pop(), stack.values.pop())
         return
 
     def clears(self, ctx: Context):
-        ctx.stack = []
-        return
+        ctx.stack.clear()
+        return
+
+    def stack_arithmetics(self, ctx: Context, op_type: ArithmeticsType):
+        stack = ctx.stack
+        types = stack.types
+        if len(types) < 2:
+            raise self.stack_underflow(ctx, 2)
+
+        values = stack.values
+        if types[-1] == types[-2] and types[-1] in ('int', 'float') \
+                and (values[-1] != 0 or op_type is ArithmeticsType.ADD or op_type is ArithmeticsType.SUB
+                     or op_type is ArithmeticsType.MUL):
+            types.pop()
+            value2 = values.pop()
+            values[-1] = ArithmeticEvaluator.funcs[op_type](values[-1], value2)
+            return
+
+        sym2 = stack.pop()
+        sym1 = stack.pop()
+        stack.push(sym1.type, self.calc_arithmetics(sym1, sym2, ctx, op_type))
+
+    def stack_logic(self, ctx: Context, op_type: LogicType, allowed_types: list):
+        stack = ctx.stack
+        types = stack.types
+        if len(types) < 2:
+            raise self.stack_underflow(ctx, 2)
+
+        if types[-1] == types[-2] and types[-1] in allowed_types:
+            values = stack.values
+            types.pop()
+            value2 = values.pop()
+            types[-1] = 'bool'
+            values[-1] = LogicEvaluator.funcs[op_type](values[-1], value2)
+            return
+
+        sym2 = stack.pop()
+        sym1 = stack.pop()
+        stack.push('bool', self.calc_logic(sym1, sym2, ctx, op_type, allowed_types))
+
+    # Pops two values and returns True, if they are equal
+    def stack_equal(self, ctx: Context) -> bool:
+        stack = ctx.stack
+        types = stack.types
+        if len(types) < 2:
+            raise self.stack_underflow(ctx, 2)
+
+        if types[-1] == types[-2]:
+            values = stack.values
+            types.pop()
+            types.pop()
+            value2 = values.pop()
+            return values.pop() == value2
+
+        sym2 = stack.pop()
+        sym1 = stack.pop()
+        return self.calc_logic(sym1, sym2, ctx, LogicType.EQ, ['int', 'float', 'string', 'bool', 'nil'])
 
     def adds(self, ctx: Context):
-        self.check_stack_len(ctx, 2)
-        sym2 = ctx.stack.pop()
-        sym1 = ctx.stack.pop()
-
-        result = self.calc_arithmetics(sym1, sym2, ctx, ArithmeticsType.ADD)
-        ctx.stack.append(Variable(sym1.type, result))
-        return
+        self.stack_arithmetics(ctx, ArithmeticsType.ADD)
 
     def subs(self, ctx: Context):
-        self.check_stack_len(ctx, 2)
-        sym2 = ctx.stack.pop()
-        sym1 = ctx.stack.pop()
-
-        result = self.calc_arithmetics(sym1, sym2, ctx, ArithmeticsType.SUB)
-        ctx.stack.append(Variable(sym1.type, result))
-        return
+        self.stack_arithmetics(ctx, ArithmeticsType.SUB)
 
     def muls(self, ctx: Context):
-        self.check_stack_len(ctx, 2)
-        sym2 = ctx.stack.pop()
-        sym1 = ctx.stack.pop()
-
-        result = self.calc_arithmetics(sym1, sym2, ctx, ArithmeticsType.MUL)
-        ctx.stack.append(Variable(sym1.type, result))
-        return
+        self.stack_arithmetics(ctx, ArithmeticsType.MUL)
 
     def idivs(self, ctx: Context):
-        self.check_stack_len(ctx, 2)
-        sym2 = ctx.stack.pop()
-        sym1 = ctx.stack.pop()
-        if sym2.float_value() == 0:
-            ctx.error("you can't divide by zero =(")
-            exit(ExitCode.BAD_OPERAND_VALUE.value)
-
-        result = self.calc_arithmetics(sym1, sym2, ctx, ArithmeticsType.IDIV)
-        ctx.stack.append(Variable(sym1.type, result))
-        return
+        self.stack_arithmetics(ctx, ArithmeticsType.IDIV)
 
     def lts(self, ctx: Context):
-        self.check_stack_len(ctx, 2)
-        sym2 = ctx.stack.pop()
-        sym1 = ctx.stack.pop()
-
-        result = self.calc_logic(sym1, sym2, ctx, LogicType.LT, ['int', 'float', 'string', 'bool'])
-        ctx.stack.append(Variable('bool', result))
-        return
+        self.stack_logic(ctx, LogicType.LT, ['int', 'float', 'string', 'bool'])
 
     def gts(self, ctx: Context):
-        self.check_stack_len(ctx, 2)
-        sym2 = ctx.stack.pop()
-        sym1 = ctx.stack.pop()
-
-        result = self.calc_logic(sym1, sym2, ctx, LogicType.GT, ['int', 'float', 'string', 'bool'])
-        ctx.stack.append(Variable('bool', result))
-        return
+        self.stack_logic(ctx, LogicType.GT, ['int', 'float', 'string', 'bool'])
 
     def eqs(self, ctx: Context):
-        self.check_stack_len(ctx, 2)
-        sym2 = ctx.stack.pop()
-        sym1 = ctx.stack.pop()
-
-        result = self.calc_logic(sym1, sym2, ctx, LogicType.EQ, ['int', 'float', 'string', 'bool', 'nil'])
-        ctx.stack.append(Variable('bool', result))
-        return
+        self.stack_logic(ctx, LogicType.EQ, ['int', 'float', 'string', 'bool', 'nil'])
 
     def ands(self, ctx: Context):
-        self.check_stack_len(ctx, 2)
-        sym2 = ctx.stack.pop()
-        sym1 = ctx.stack.pop()
-
-        result = self.calc_logic(sym1, sym2, ctx, LogicType.AND, ['bool'])
-        ctx.stack.append(Variable('bool', result))
-        return
+        self.stack_logic(ctx, LogicType.AND, ['bool'])
 
     def ors(self, ctx: Context):
-        self.check_stack_len(ctx, 2)
-        sym2 = ctx.stack.pop()
-        sym1 = ctx.stack.pop()
-
-        result = self.calc_logic(sym1, sym2, ctx, LogicType.OR, ['bool'])
-        ctx.stack.append(Variable('bool', result))
-        return
+        self.stack_logic(ctx, LogicType.OR, ['bool'])
 
     def nots(self, ctx: Context):
-        self.check_stack_len(ctx, 1)
-        sym1 = ctx.stack.pop()
+        stack = ctx.stack
+        if len(stack.types) < 1:
+            raise self.stack_underflow(ctx, 1)
 
-        result = self.calc_logic(sym1, None, ctx, LogicType.NOT, ['bool'])
-        ctx.stack.append(Variable('bool', result))
-        return
+        if stack.types[-1] == 'bool':
+            stack.values[-1] = not stack.values[-1]
+            return
+
+        sym1 = stack.pop()
+        stack.push('bool', self.calc_logic(sym1, None, ctx, LogicType.NOT, ['bool']))
 
     def int2chars(self, ctx: Context):
-        self.check_stack_len(ctx, 1)
-        sym1 = ctx.stack.pop()
+        stack = ctx.stack
+        if len(stack.types) < 1:
+            raise self.stack_underflow(ctx, 1)
+
+        sym1 = stack.pop()
         TypeChecker.full_check(ctx, self.opcode, sym1, ['int'])
 
         try:
-            result = chr(int(sym1.value))
-            ctx.stack.append(Variable('string', result))
-        except ValueError:
-            ctx.error(f'{sym1.value} is an incorrect Unicode code.')
-            exit(ExitCode.BAD_STRING_OPERATION.value)
+            result = chr(sym1.value)
+            stack.push('string', result)
+        except (ValueError, OverflowError):
+            raise InterpretError(ExitCode.BAD_STRING_OPERATION, f'{sym1.value} is an incorrect Unicode code.')
         return
 
     def stri2ints(self, ctx: Context):
-        self.check_stack_len(ctx, 2)
-        sym2 = ctx.stack.pop()
-        sym1 = ctx.stack.pop()
+        stack = ctx.stack
+        if len(stack.types) < 2:
+            raise self.stack_underflow(ctx, 2)
+
+        sym2 = stack.pop()
+        sym1 = stack.pop()
 
         TypeChecker.full_check(ctx, self.opcode, sym1, ['string'])
         TypeChecker.full_check(ctx, self.opcode, sym2, ['int'])
 
-        if int(sym2.value) < 0 or int(sym2.value) >= len(sym1.value):
-            ctx.error('index is out of range.')
-            exit(ExitCode.BAD_STRING_OPERATION.value)
+        if sym2.value < 0 or sym2.value >= len(sym1.value):
+            raise InterpretError(ExitCode.BAD_STRING_OPERATION, 'index is out of range.')
 
-        char = sym1.value[int(sym2.value)]
-        ctx.stack.append(Variable('int', ord(char)))
+        char = sym1.value[sym2.value]
+        stack.push('int', ord(char))
         return
 
     def jumpifeqs(self, ctx: Context):
-        self.check_stack_len(ctx, 2)
-        sym2 = ctx.stack.pop()
-        sym1 = ctx.stack.pop()
-        label = self.args[0].value
-
-        result = self.calc_logic(sym1, sym2, ctx, LogicType.EQ, ['int', 'float', 'string', 'bool', 'nil'])
-        if result:
-            ctx.jump_to_label(label)
+        if self.stack_equal(ctx):
+            ctx.current_pos = self.target
         return
 
     def jumpifneqs(self, ctx: Context):
-        self.check_stack_len(ctx, 2)
-        sym2 = ctx.stack.pop()
-        sym1 = ctx.stack.pop()
-        label = self.args[0].value
-
-        result = self.calc_logic(sym1, sym2, ctx, LogicType.EQ, ['int', 'float', 'string', 'bool', 'nil'])
-        if not result:
-            ctx.jump_to_label(label)
+        if not self.stack_equal(ctx):
+            ctx.current_pos = self.target
         return
 
     # endregion
@@ -363,47 +417,36 @@ class Instruction:
         if allowed_types is None:
             allowed_types = ['int', 'float']
 
-        TypeChecker.full_check(ctx, self.opcode, var1, allowed_types)
-        TypeChecker.full_check(ctx, self.opcode, var2, allowed_types)
-
-        if var1.type != var2.type:
-            ctx.error(f"operands must have the same type. Current types: {var1.type} and {var2.type}")
-            exit(ExitCode.BAD_OPERAND_TYPE.value)
+        if not self.types_checked:
+            TypeChecker.full_check(ctx, self.opcode, var1, allowed_types)
+            TypeChecker.full_check(ctx, self.opcode, var2, allowed_types)
 
-        value1 = None
-        value2 = None
+            if var1.type != var2.type:
+                raise InterpretError(ExitCode.BAD_OPERAND_TYPE, f"operands must have the same type. Current types: {var1.type} and {var2.type}")
 
-        if var1.type == 'int':
-            value1 = int(var1.value)
-            value2 = int(var2.value)
-        elif var2.type == 'float':
-            value1 = var1.float_value()
-            value2 = var2.float_value()
+        if (op_type == ArithmeticsType.IDIV or op_type == ArithmeticsType.DIV) and var2.value == 0:
+            raise InterpretError(ExitCode.BAD_OPERAND_VALUE, "you can't divide by zero =(")
 
-        return ArithmeticEvaluator(value1, value2, op_type).eval()
+        return ArithmeticEvaluator(var1.value, var2.value, op_type).eval()
 
     def int2float(self, ctx: Context):
         sym1 = ctx.get_variable_from_arg(self.args[1])
         if sym1.type != 'int':
-            ctx.error('INT2FLOAT accepts only integer parameters.')
-            exit(ExitCode.BAD_OPERAND_TYPE.value)
+            raise InterpretError(ExitCode.BAD_OPERAND_TYPE, 'INT2FLOAT accepts only integer parameters.')
 
         val = float(sym1.value)
-        var = self.args[0].value.split('@')
-        ctx.set_variable(var[0], var[1], 'float', val)
+        self.update_var_in_args(ctx, 'float', val)
 
         return
 
     def float2int(self, ctx: Context):
         sym1 = ctx.get_variable_from_arg(self.args[1])
         if sym1.type != 'float':
-            ctx.error('FLOAT2INT accepts only float parameters.')
-            exit(ExitCode.BAD_OPERAND_TYPE.value)
+            raise InterpretError(ExitCode.BAD_OPERAND_TYPE, 'FLOAT2INT accepts only float parameters.')
 
-        val = int(sym1.float_value())
+        val = int(sym1.value)
 
-        var = self.args[0].value.split('@')
-        ctx.set_variable(var[0], var[1], 'int', val)
+        self.update_var_in_args(ctx, 'int', val)
 
         return
 
@@ -412,9 +455,9 @@ class Instruction:
         sym2 = ctx.get_variable_from_arg(self.args[2])
 
         result = self.calc_arithmetics(sym1, sym2, ctx, ArithmeticsType.ADD)
+        self.observe(sym1.type, sym2.type)
 
-        var = self.args[0].value.split('@')
-        ctx.set_variable(var[0], var[1], sym1.type, result)
+        self.update_var_in_args(ctx, sym1.type, result)
         return
 
     def sub(self, ctx: Context):
@@ -422,9 +465,9 @@ class Instruction:
         sym2 = ctx.get_variable_from_arg(self.args[2])
 
         result = self.calc_arithmetics(sym1, sym2, ctx, ArithmeticsType.SUB)
+        self.observe(sym1.type, sym2.type)
 
-        var = self.args[0].value.split('@')
-        ctx.set_variable(var[0], var[1], sym1.type, result)
+        self.update_var_in_args(ctx, sym1.type, result)
         return
 
     def mul(self, ctx: Context):
@@ -432,41 +475,38 @@ class Instruction:
         sym2 = ctx.get_variable_from_arg(self.args[2])
 
         result = self.calc_arithmetics(sym1, sym2, ctx, ArithmeticsType.MUL)
+        self.observe(sym1.type, sym2.type)
 
-        var = self.args[0].value.split('@')
-        ctx.set_variable(var[0], var[1], sym1.type, result)
+        self.update_var_in_args(ctx, sym1.type, result)
         return
 
     def idiv(self, ctx: Context):
         sym1 = ctx.get_variable_from_arg(self.args[1])
         sym2 = ctx.get_variable_from_arg(self.args[2])
-        if sym2.float_value() == 0:
-            ctx.error("you can't divide by zero =(")
-            exit(ExitCode.BAD_OPERAND_VALUE.value)
 
         result = self.calc_arithmetics(sym1, sym2, ctx, ArithmeticsType.IDIV)
+        self.observe(sym1.type, sym2.type)
 
-        var = self.args[0].value.split('@')
-        ctx.set_variable(var[0], var[1], sym1.type, result)
+        self.update_var_in_args(ctx, sym1.type, result)
         return
 
     def div(self, ctx):
         sym1 = ctx.get_variable_from_arg(self.args[1])
         sym2 = ctx.get_variable_from_arg(self.args[2])
-        if sym2.float_value() == 0:
-            ctx.error("you can't divide by zero =(")
-            exit(ExitCode.BAD_OPERAND_VALUE.value)
 
         result = self.calc_arithmetics(sym1, sym2, ctx, ArithmeticsType.DIV, allowed_types=['float'])
+        self.observe(sym1.type, sym2.type)
 
-        var = self.args[0].value.split('@')
-        ctx.set_variable(var[0], var[1], sym1.type, result)
+        self.update_var_in_args(ctx, sym1.type, result)
         return
 
     def calc_logic(self, var1: Variable, var2: Variable or None, ctx: Context, op_type: LogicType, allowed_types) -> bool:
+        if self.types_checked:
+            return LogicEvaluator(op_type, var1.value, None if var2 is None else var2.value).eval()
+
         TypeChecker.full_check(ctx, self.opcode, var1, allowed_types)
 
-        value1 = var1.unwrap()
+        value1 = var1.value
         value2 = None
 
         if var2 is not None:
@@ -475,7 +515,7 @@ class Instruction:
                 TypeChecker.var_type_check(ctx, self.opcode, var1, [var2.type, 'nil'])  # args must be of the same type or nil
             else:
                 TypeChecker.var_type_check(ctx, self.opcode, var2, [var1.type, 'nil'])
-            value2 = var2.unwrap()
+            value2 = var2.value
 
         return LogicEvaluator(op_type, value1, value2).eval()
 
@@ -484,6 +524,7 @@ class Instruction:
         sym2 = ctx.get_variable_from_arg(self.args[2])
 
         result = self.calc_logic(sym1, sym2, ctx, LogicType.LT, ['int', 'float', 'string', 'bool'])
+        self.observe(sym1.type, sym2.type)
         self.update_var_in_args(ctx, 'bool', result)
         return
 
@@ -492,6 +533,7 @@ class Instruction:
         sym2 = ctx.get_variable_from_arg(self.args[2])
 
         result = self.calc_logic(sym1, sym2, ctx, LogicType.GT, ['int', 'float', 'string', 'bool'])
+        self.observe(sym1.type, sym2.type)
         self.update_var_in_args(ctx, 'bool', result)
         return
 
@@ -500,6 +542,7 @@ class Instruction:
         sym2 = ctx.get_variable_from_arg(self.args[2])
 
         result = self.calc_logic(sym1, sym2, ctx, LogicType.EQ, ['int', 'float', 'string', 'bool', 'nil'])
+        self.observe(sym1.type, sym2.type)
         self.update_var_in_args(ctx, 'bool', result)
         return
 
@@ -508,6 +551,7 @@ class Instruction:
         sym2 = ctx.get_variable_from_arg(self.args[2])
 
         result = self.calc_logic(sym1, sym2, ctx, LogicType.AND, ['bool'])
+        self.observe(sym1.type, sym2.type)
         self.update_var_in_args(ctx, 'bool', result)
         return
 
@@ -516,6 +560,7 @@ class Instruction:
         sym2 = ctx.get_variable_from_arg(self.args[2])
 
         result = self.calc_logic(sym1, sym2, ctx, LogicType.OR, ['bool'])
+        self.observe(sym1.type, sym2.type)
         self.update_var_in_args(ctx, 'bool', result)
         return
 
@@ -528,85 +573,69 @@ class Instruction:
 
     def int2char(self, ctx: Context):
         sym1 = ctx.get_variable_from_arg(self.args[1])
-        TypeChecker.full_check(ctx, self.opcode, sym1, ['int'])
+        if not self.types_checked:
+            TypeChecker.full_check(ctx, self.opcode, sym1, ['int'])
 
         try:
-            result = chr(int(sym1.value))
-            var = self.args[0].value.split('@')
-            ctx.set_variable(var[0], var[1], 'string', result)
-        except ValueError:
-            ctx.error(f'{sym1.value} is an incorrect Unicode code.')
-            exit(ExitCode.BAD_STRING_OPERATION.value)
+            result = chr(sym1.value)
+            self.update_var_in_args(ctx, 'string', result)
+        except (ValueError, OverflowError):
+            raise InterpretError(ExitCode.BAD_STRING_OPERATION, f'{sym1.value} is an incorrect Unicode code.')
         return
 
     def stri2int(self, ctx: Context):
         sym1 = ctx.get_variable_from_arg(self.args[1])
         sym2 = ctx.get_variable_from_arg(self.args[2])
 
-        TypeChecker.full_check(ctx, self.opcode, sym1, ['string'])
-        TypeChecker.full_check(ctx, self.opcode, sym2, ['int'])
+        if not self.types_checked:
+            TypeChecker.full_check(ctx, self.opcode, sym1, ['string'])
+            TypeChecker.full_check(ctx, self.opcode, sym2, ['int'])
 
-        if int(sym2.value) < 0 or int(sym2.value) >= len(sym1.value):
-            ctx.error('index is out of range.')
-            exit(ExitCode.BAD_STRING_OPERATION.value)
+        if sym2.value < 0 or sym2.value >= len(sym1.value):
+            raise InterpretError(ExitCode.BAD_STRING_OPERATION, 'index is out of range.')
 
-        char = sym1.value[int(sym2.value)]
-        var = self.args[0].value.split('@')
-        ctx.set_variable(var[0], var[1], 'int', ord(char))
+        char = sym1.value[sym2.value]
+        self.update_var_in_args(ctx, 'int', ord(char))
         return
     # endregion
 
     # region I/O
     def read(self, ctx: Context):
-        var = self.args[0].value.split('@')
         if self.args[1].value == 'int':
             try:
                 data = int(ctx.input.readline())
-                ctx.set_variable(var[0], var[1], 'int', data)
+                self.update_var_in_args(ctx, 'int', data)
             except ValueError:
-                ctx.set_variable(var[0], var[1], 'nil', 'nil')
+                self.update_var_in_args(ctx, 'nil', None)
         elif self.args[1].value == 'float':
             f_input = ctx.input.readline()
             try:
                 data = float(f_input)
-                ctx.set_variable(var[0], var[1], 'float', data)
+                self.update_var_in_args(ctx, 'float', data)
             except ValueError:
                 try:
                     data = float.fromhex(f_input)
-                    ctx.set_variable(var[0], var[1], 'float', data)
+                    self.update_var_in_args(ctx, 'float', data)
                 except ValueError:
-                    ctx.set_variable(var[0], var[1], 'nil', 'nil')
+                    self.update_var_in_args(ctx, 'nil', None)
         elif self.args[1].value == 'bool':
             data = ctx.input.readline().lower()
-            if data == 'true' or data == 'true\n':
-                ctx.set_variable(var[0], var[1], 'bool', 'true')
-            else:
-                ctx.set_variable(var[0], var[1], 'bool', 'false')
+            self.update_var_in_args(ctx, 'bool', data == 'true' or data == 'true\n')
         elif self.args[1].value == 'string':
             data = ctx.input.readline().rstrip('\n')
-            ctx.set_variable(var[0], var[1], 'string', data)
+            self.update_var_in_args(ctx, 'string', data)
         else:
-            ctx.error('READ only accepts integer, float, boolean and string types.')
-            exit(ExitCode.BAD_OPERAND_VALUE.value)
+            raise InterpretError(ExitCode.BAD_OPERAND_VALUE, 'READ only accepts integer, float, boolean and string types.')
 
         return
 
     def write(self, ctx: Context):
         sym = ctx.get_variable_from_arg(self.args[0])
-        TypeChecker.full_check(ctx, self.opcode, sym, ['int', 'float', 'bool', 'nil', 'string'])
+        if not self.types_checked:
+            TypeChecker.full_check(ctx, self.opcode, sym, ['int', 'float', 'bool', 'nil', 'string'])
 
-        output = sym.value
-        if sym.type == 'nil':
-            output = ''
-        elif sym.type == 'string':
-            for i in range(999):
-                number = "\\{:03d}".format(i)
-                sym.value = sym.value.replace(number, chr(i))
-            output = sym.value
-        elif sym.type == 'float':
-            output = sym.float_value().hex()
-
-        print(output, end='')
+        if sym.type != 'nil':
+            ctx.output.write(sym.str_value())
 
         return
     # endregion
@@ -616,26 +645,22 @@ class Instruction:
         sym1 = ctx.get_variable_from_arg(self.args[1])
         sym2 = ctx.get_variable_from_arg(self.args[2])
         if sym1.type != 'string' or sym2.type != 'string':
-            ctx.error('CONCAT accepts only string parameters.')
-            exit(ExitCode.BAD_OPERAND_TYPE.value)
+            raise InterpretError(ExitCode.BAD_OPERAND_TYPE, 'CONCAT accepts only string parameters.')
 
-        result = sym1.value + sym2.value
+        result = Rope.concat(sym1.value, sym2.value)
 
-        var = self.args[0].value.split('@')
-        ctx.set_variable(var[0], var[1], 'string', result)
+        self.update_var_in_args(ctx, 'string', result)
 
         return
 
     def strlen(self, ctx: Context):
         sym1 = ctx.get_variable_from_arg(self.args[1])
         if sym1.type != 'string':
-            ctx.error('STRLEN accepts only a string parameter.')
-            exit(ExitCode.BAD_OPERAND_TYPE.value)
+            raise InterpretError(ExitCode.BAD_OPERAND_TYPE, 'STRLEN accepts only a string parameter.')
 
         result = len(sym1.value)
 
-        var = self.args[0].value.split('@')
-        ctx.set_variable(var[0], var[1], 'int', result)
+        self.update_var_in_args(ctx, 'int', result)
 
         return
 
@@ -643,43 +668,38 @@ class Instruction:
         sym1 = ctx.get_variable_from_arg(self.args[1])
         sym2 = ctx.get_variable_from_arg(self.args[2])
         if sym1.type != 'string' or sym2.type != 'int':
-            ctx.error('GETCHAR expected signature is VAR STRING INT.')
-            exit(ExitCode.BAD_OPERAND_TYPE.value)
-        if int(sym2.value) < 0 or int(sym2.value) >= len(sym1.value):
-            ctx.error('Index is out of range.')
-            exit(ExitCode.BAD_STRING_OPERATION.value)
+            raise InterpretError(ExitCode.BAD_OPERAND_TYPE, 'GETCHAR expected signature is VAR STRING INT.')
+        if sym2.value < 0 or sym2.value >= len(sym1.value):
+            raise InterpretError(ExitCode.BAD_STRING_OPERATION, 'Index is out of range.')
 
-        result = sym1.value[int(sym2.value)]
+        result = sym1.value[sym2.value]
 
-        var = self.args[0].value.split('@')
-        ctx.set_variable(var[0], var[1], 'string', result)
+        self.update_var_in_args(ctx, 'string', result)
         return
 
     def setchar(self, ctx: Context):
-        var_data = self.args[0].value.split('@')
-        var = ctx.get_variable(var_data[0], var_data[1])
+        var = ctx.get_variable(self.args[0])
         sym1 = ctx.get_variable_from_arg(self.args[1])
         sym2 = ctx.get_variable_from_arg(self.args[2])
         if var.type != 'string' or sym1.type != 'int' or sym2.type != 'string':
-            ctx.error('SETCHAR expected signature is VAR(STRING) INT STRING.')
-            exit(ExitCode.BAD_OPERAND_TYPE.value)
-        if int(sym1.value) < 0 or int(sym1.value) >= len(var.value):
-            ctx.error('Index is out of range.')
-            exit(ExitCode.BAD_STRING_OPERATION.value)
+            raise InterpretError(ExitCode.BAD_OPERAND_TYPE, 'SETCHAR expected signature is VAR(STRING) INT STRING.')
+        if sym1.value < 0 or sym1.value >= len(var.value):
+            raise InterpretError(ExitCode.BAD_STRING_OPERATION, 'Index is out of range.')
         if sym2.value == '':
-            ctx.error('Char can\'t be empty.')
-            exit(ExitCode.BAD_STRING_OPERATION.value)
+            raise InterpretError(ExitCode.BAD_STRING_OPERATION, 'Char can\'t be empty.')
 
-        var.value = var.value[:int(sym1.value)] + sym2.value[0] + var.value[int(sym1.value) + 1:]
-        ctx.set_variable(var_data[0], var_data[1], 'string', var.value)
+        buffer = var.value
+        if type(buffer) is not CharBuffer or buffer.shared:
+            buffer = CharBuffer(str(buffer))
+            var.value = buffer
+        buffer.set(sym1.value, sym2.value[0])
         return
     # endregion
 
     # region Types
     def type(self, ctx: Context):
         sym1 = ctx.get_variable_from_arg(self.args[1])
-        var_data = self.args[0].value.split('@')
-        ctx.set_variable(var_data[0], var_data[1], 'string', sym1.type)
+        self.update_var_in_args(ctx, 'string', sym1.type)
         return
     # endregion
 
@@ -688,53 +708,50 @@ class Instruction:
         return
 
     def jump(self, ctx: Context):
-        ctx.jump_to_label(self.args[0].value)
+        ctx.current_pos = self.target
         return
 
     def jumpifeq(self, ctx: Context):
         sym1 = ctx.get_variable_from_arg(self.args[1])
         sym2 = ctx.get_variable_from_arg(self.args[2])
-        label = self.args[0].value
 
         result = self.calc_logic(sym1, sym2, ctx, LogicType.EQ, ['int', 'float', 'string', 'bool', 'nil'])
+        self.observe(sym1.type, sym2.type)
         if result:
-            ctx.jump_to_label(label)
+            ctx.current_pos = self.target
         return
 
     def jumpifneq(self, ctx: Context):
         sym1 = ctx.get_variable_from_arg(self.args[1])
         sym2 = ctx.get_variable_from_arg(self.args[2])
-        label = self.args[0].value
 
         result = self.calc_logic(sym1, sym2, ctx, LogicType.EQ, ['int', 'float', 'string', 'bool', 'nil'])
+        self.observe(sym1.type, sym2.type)
         if not result:
-            ctx.jump_to_label(label)
+            ctx.current_pos = self.target
         return
 
     def exit(self, ctx: Context):
         sym1 = ctx.get_variable_from_arg(self.args[0])
         if sym1.type != 'int':
-            ctx.error('EXIT only accepts an integer parameter.')
-            exit(ExitCode.BAD_OPERAND_TYPE.value)
+            raise InterpretError(ExitCode.BAD_OPERAND_TYPE, 'EXIT only accepts an integer parameter.')
 
-        val = int(sym1.value)
+        val = sym1.value
         if val < 0 or val > 49:
-            ctx.error('EXIT parameter should be in 0-49 range.')
-            exit(ExitCode.BAD_OPERAND_VALUE.value)
+            raise InterpretError(ExitCode.BAD_OPERAND_VALUE, 'EXIT parameter should be in 0-49 range.')
 
-        exit(val)
-
-        return
+        raise ProgramExit(val)
     # endregion
 
     # region Debug
     def dprint(self, ctx: Context):
         sym1 = ctx.get_variable_from_arg(self.args[0])
-        print(sym1.value, file=sys.stderr)
+        ctx.output.flush()
+        print(sym1.str_value(), file=ctx.error_output)
         return
 
     def exec_break(self, ctx: Context):
-        result = f'Current instruction: {ctx.current_pos}\n'
+        result = f'Current instruction: {self.order - 1}\n'
         result += f'Stack ({len(ctx.stack)} elements):\n'
 
         index = -1
@@ -742,23 +759,24 @@ class Instruction:
             result += f'({(index + 1) / -1}) {v}\n'
 
         result += f'\nGF ({len(ctx.GF)} elements):\n'
-        for el in ctx.GF:
-            result += f'{el} = {ctx.GF[el]}\n'
+        for name, var in ctx.GF.items():
+            result += f'{name} = {var}\n'
 
         if len(ctx.LFs) != 0:
             result += f'\nLF ({len(ctx.LFs[-1])} elements):\n'
-            for el in ctx.GF:
-                result += f'{el} = {ctx.LFs[-1][el]}\n'
+            for name, var in ctx.LFs[-1].items():
+                result += f'{name} = {var}\n'
         else:
             result += 'LF does not exist.\n'
 
         if ctx.TF is not None:
-            result += f'\nGF ({len(ctx.TF)} elements):\n'
-            for el in ctx.TF:
-                result += f'{el} = {ctx.TF[el]}\n'
+            result += f'\nTF ({len(ctx.TF)} elements):\n'
+            for name, var in ctx.TF.items():
+                result += f'{name} = {var}\n'
         else:
             result += 'TF does not exist.\n'
 
-        print(result, file=sys.stderr, end='')
+        ctx.output.flush()
+        print(result, file=ctx.error_output, end='')
         return
     # endregion
@@ -1,7 +1,9 @@
 import argparse
+import signal
 
-from exit_code import ExitCode
+from exit_code import ExitCode, InterpretError
 from interpreter import Interpreter
+from limits import Limits
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser('interpret.py', add_help=False)
@@ -12,25 +14,79 @@ if __name__ == '__main__':
     parser.add_argument('--insts', action='append_const', const='insts', dest='stats_order', help='will print the amount of the executed instructions to the stats file')
     parser.add_argument('--hot', action='append_const', const='hot', dest='stats_order', help='will print the order attribute value of the most frequent instruction to the stats file')
     parser.add_argument('--vars', action='append_const', const='var', dest='stats_order', help='will print the maximum amount of initialized variables in all frames to the stats file')
+    parser.add_argument('--warnings', action='store_true', help='print warnings about the loaded program (e.g. unreachable code).')
+    parser.add_argument('--optimize', action='store_true', help='fuse common instruction sequences and thread jumps before the execution.')
+    parser.add_argument('--compile', action='store_true', help='compile the program to Python code before the execution.')
+    parser.add_argument('--trace', action='store_true', help='compile hot loops to Python code while the program is executed.')
+    parser.add_argument('--profile-out', action='store', metavar='FILE', help='save the execution profile of the program to the file.')
+    parser.add_argument('--profile-in', action='store', metavar='FILE', help='specialize the program by a profile saved by --profile-out.')
+    parser.add_argument('--max-insts', action='store', type=int, metavar='N', help='stop the program after N executed instructions (exit code 60).')
+    parser.add_argument('--timeout', action='store', type=float, metavar='SECONDS', help='stop the program after the specified time (exit code 60).')
+    parser.add_argument('--max-stack', action='store', type=int, metavar='N', help='stop the program when the data stack has more than N values (exit code 60).')
+    parser.add_argument('--max-call-depth', action='store', type=int, metavar='N', help='stop the program when more than N calls are nested (exit code 60).')
+    parser.add_argument('--line-buffered', action='store_true', help='flush the output after every line (for interactive use).')
+    parser.add_argument('--cache', action='store', metavar='DIR', help='set a directory for caching of loaded programs.')
+    parser.add_argument('--serve', action='store', metavar='SOCKET', help='run as a server listening on the specified Unix socket.')
+    parser.add_argument('--workers', action='store', type=int, help='set the amount of worker processes of the server (default: CPU count).')
 
     args = parser.parse_args()
+    limits = None
+    if args.max_insts is not None or args.timeout is not None or args.max_stack is not None \
+            or args.max_call_depth is not None:
+        limits = Limits(args.max_insts, args.timeout, args.max_stack, args.max_call_depth)
+
+    if args.serve is not None:
+        from server import Server
+
+        # The limits apply to every request, requests can set lower limits
+        server = Server(args.serve, args.workers, limits)
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        exit(ExitCode.OK.value)
+
     if args.source is None and args.input is None:
         Interpreter.error('at least one argument (--source or --input) must be set.')
         exit(ExitCode.MISSING_ARGUMENT.value)
     if args.stats is None and args.stats_order is not None:
         Interpreter.error('path to the stats file was not set.')
         exit(ExitCode.MISSING_ARGUMENT.value)
+    # A run is executed by one engine: compiled code, the tracer or the interpreter observed by the profile
+    if args.compile and args.trace:
+        Interpreter.error('--compile and --trace can\'t be used together.')
+        exit(ExitCode.MISSING_ARGUMENT.value)
+    if args.profile_out is not None and (args.compile or args.trace):
+        Interpreter.error('--profile-out can\'t be used together with --compile or --trace.')
+        exit(ExitCode.MISSING_ARGUMENT.value)
 
+    interpreter = None
     try:
-        interpreter = Interpreter(args.source, args.input)
+        interpreter = Interpreter(args.source, args.input, args.stats_order, args.cache, args.line_buffered,
+                                  args.optimize, args.compile, args.trace, args.profile_in, args.profile_out,
+                                  limits)
         interpreter.parse_xml()
-        interpreter.execute()
-        if args.stats is not None:
+        if args.warnings:
+            for warning in interpreter.program.warnings:
+                Interpreter.warning(warning)
+        exit_code = interpreter.execute()
+        # Statistics of runs stopped by a limit are written as well, they show how far the program got
+        if args.stats is not None and (interpreter.result.finished or interpreter.result.limit_exceeded):
             interpreter.print_stats(args.stats, args.stats_order)
+    except InterpretError as e:
+        Interpreter.error(e.message)
+        exit(e.code.value)
     except FileNotFoundError:
         Interpreter.error("specified file was not found.")
         exit(ExitCode.READ_ERROR.value)
     except Exception as e:
         Interpreter.error(f"Unexpected error of type {type(e)}: {e}\n\n{e.with_traceback()}")
         exit(ExitCode.INTERNAL_ERROR.value)
+    finally:
+        if interpreter is not None:
+            interpreter.close()
 
+    exit(exit_code)
@@ -1,39 +1,39 @@
-import io
+import hashlib
+import mmap
 import os.path
-import re
 import sys
 import xml.etree.ElementTree as ET
 
-from context import Context
-from instruction import Instruction
-from argument import Argument
-from exit_code import ExitCode
+from execution_profile import Profile
+from exit_code import ExitCode, InterpretError
+from limits import Limits
+from mapped_input import MappedInput
+from program import Program
+from program_cache import ProgramCache
 
 
 class Interpreter:
-    xml_tree = None
-    input_stream = None
-    context = None
-
-    @staticmethod
-    def __read_source_from_stdin():
-        result = ''
-        for line in sys.stdin:
-            result += line
+    # Must be changed whenever the loaded representation of programs changes, invalidates cached programs
+    version = '1.3'
+    # Size of the blocks in which the XML source is passed to the parser
+    chunk_size = 1 << 16
 
-        return result
+    source = None
+    input_stream = None
+    cache = None
+    program = None
+    result = None
 
-    def __init__(self, source_file, input_file):
+    def __init__(self, source_file, input_file, stats: list = None, cache_dir: str = None,
+                 line_buffered: bool = False, optimize: bool = False, compiled: bool = False,
+                 tracing: bool = False, profile_in: str = None, profile_out: str = None, limits: Limits = None):
         if source_file is None:
-            xml = self.__read_source_from_stdin()
+            self.source = sys.stdin.buffer.read()
         else:
-            xml = source_file
+            self.source = MappedInput.map_file(source_file)
 
-        try:
-            self.xml_tree = ET.parse(xml)
-        except ET.ParseError:
-            self.error('Invalid XML file.')
-            exit(ExitCode.BAD_XML.value)
+        if cache_dir is not None:
+            self.cache = ProgramCache(cache_dir, Interpreter.version)
 
         if input_file is None:
             self.input_stream = sys.stdin
@@ -41,120 +41,183 @@ class Interpreter:
             if not os.path.exists(input_file):
                 raise FileNotFoundError
             else:
-                self.input_stream = io.open(input_file, 'r')
-
-        self.context = Context(self.input_stream)
-
-    def execute(self):
-        self.context.execute()
+                self.input_stream = MappedInput.open(input_file)
+
+        self.stats = stats
+        self.line_buffered = line_buffered
+        self.optimize = optimize
+        self.compiled = compiled
+        self.tracing = tracing
+        self.profile_in = profile_in
+        self.profile_out = profile_out
+        self.limits = limits
+
+    def execute(self) -> int:
+        profile = Profile(self.source_hash()) if self.profile_out is not None else None
+        self.result = self.program.execute(self.input_stream, sys.stdout, sys.stderr, self.stats,
+                                           self.line_buffered, profile, self.limits)
+        if profile is not None:
+            profile.save(self.profile_out)
+        return self.result.exit_code
+
+    # Closes the mapped source and input files, the loaded program does not refer to them
+    def close(self):
+        if isinstance(self.source, mmap.mmap):
+            self.source.close()
+        if self.input_stream is not sys.stdin:
+            self.input_stream.close()
+
+    # Identifies the source in saved profiles
+    def source_hash(self) -> str:
+        return hashlib.sha256(self.source).hexdigest()
 
     @staticmethod
     def error(message: str):
         print(f'ERROR: {message}', file=sys.stderr)
 
-    def parse_xml(self):
-        root = self.xml_tree.getroot()
-
-        self.sort_xml(root)
-        self.validate_xml(root)
-        self.load_instructions(root)
-        self.context.load_labels()
-
-    def load_instructions(self, root: ET.Element):
-        for child in root:
-            instruction = Instruction(
-                child.attrib['opcode'].upper(),
-                int(child.attrib['order']))
-            for arg in child:
-                instruction.add_arg(Argument(
-                    arg.attrib['type'].lower(),
-                    arg.text
-                ))
+    @staticmethod
+    def warning(message: str):
+        print(f'WARNING: {message}', file=sys.stderr)
+
+    def parse_xml(self) -> Program:
+        if self.cache is not None:
+            self.program = self.cache.load(self.source)
+
+        if self.program is None:
+            self.program = self.parse_source(self.source)
+            if self.cache is not None:
+                self.cache.store(self.source, self.program)
+
+        if self.optimize:
+            self.program.optimize()
+        if self.compiled:
+            self.program.compile()
+        if self.tracing:
+            self.program.enable_tracing()
+        if self.profile_in is not None:
+            self.load_profile()
+
+        return self.program
+
+    # Profiles of another source (or invalid files and profiles which don't match the program) are ignored with
+    # a warning, the program runs as usual
+    def load_profile(self):
+        profile = Profile.load(self.profile_in)
+        if profile is None:
+            self.program.warnings.append(f'profile {self.profile_in} is not valid and was ignored.')
+        elif profile.source_hash != self.source_hash():
+            self.program.warnings.append(f'profile {self.profile_in} belongs to another source and was ignored.')
+        elif not profile.matches(self.program.loaded_instructions):
+            self.program.warnings.append(f'profile {self.profile_in} does not match the program and was ignored.')
+        else:
+            self.program.apply_profile(profile)
 
-            self.context.instructions.append(instruction)
+    # Loads a program from the XML source passed as bytes (or any other buffer)
+    @staticmethod
+    def parse_source(source) -> Program:
+        return Program.from_records(Interpreter.load_records(source))
 
+    # Parses and validates the XML in a single pass. Every instruction is converted to a record
+    # (opcode, order, ((type, value), ...)) as soon as its end tag is parsed and its element is thrown away.
+    # Structure errors (32) are reported only after the whole document is parsed, so invalid XML is still 31.
     @staticmethod
-    def sort_xml(root: ET.Element):
+    def load_records(source) -> list:
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        records = []
+        error = None
+        root = None
+        depth = 0
+
         try:
-            root[:] = sorted(root, key=lambda child: int(child.get('order')))
-        except Exception as e:
-            print(str(e), file=sys.stderr)
-            print("Unexpected error while sorting instructions.")
-            exit(ExitCode.UNEXPECTED_XML_STRUCTURE.value)
-
-        for child in root:
-            try:
-                child[:] = sorted(child, key=lambda child: child.tag)
-            except Exception as e:
-                print(str(e) + "\n", file=sys.stderr)
-                print("Unexpected error while sorting arguments", file=sys.stderr)
-                exit(ExitCode.UNEXPECTED_XML_STRUCTURE.value)
+            # Views are released before the source can be closed, even if the parser keeps them (see close())
+            with memoryview(source) as view:
+                for pos in range(0, len(view), Interpreter.chunk_size):
+                    with view[pos:pos + Interpreter.chunk_size] as chunk:
+                        parser.feed(chunk)
+                    for event, element in parser.read_events():
+                        if event == 'start':
+                            depth += 1
+                            if depth == 1:
+                                root = element
+                                error = Interpreter.check_root(root)
+                            continue
+
+                        depth -= 1
+                        if depth == 1:
+                            if error is None:
+                                try:
+                                    records.append(Interpreter.load_instruction(element))
+                                except InterpretError as e:
+                                    error = e
+                            del root[:]
+            parser.close()
+        except ET.ParseError:
+            raise InterpretError(ExitCode.BAD_XML, 'Invalid XML file.')
+
+        if error is not None:
+            raise error
+
+        records.sort(key=lambda record: record[1])
+        expected_order = 0
+        for _, order, _ in records:
+            if order <= expected_order:
+                raise InterpretError(ExitCode.UNEXPECTED_XML_STRUCTURE,
+                                     f'Expected order to be bigger then {expected_order} but it was {order}.')
+            expected_order = order
+
+        return [(opcode, order, args) for order, (opcode, _, args) in enumerate(records, 1)]
 
     @staticmethod
-    def validate_xml(root: ET.Element):
+    def check_root(root: ET.Element) -> InterpretError or None:
         if root.tag != 'program':
-            print(f"ERROR: Expected {root.tag} to be program.", file=sys.stderr)
-            exit(ExitCode.UNEXPECTED_XML_STRUCTURE.value)
+            return InterpretError(ExitCode.UNEXPECTED_XML_STRUCTURE, f'Expected {root.tag} to be program.')
 
-        if root.attrib['language'] is None or root.attrib['language'].lower() != 'ippcode22':
-            print(f'ERROR: Expected root to containt attribute language with value "IPPcode22".', file=sys.stderr)
-            exit(ExitCode.UNEXPECTED_XML_STRUCTURE.value)
+        if root.attrib.get('language') is None or root.attrib['language'].lower() != 'ippcode22':
+            return InterpretError(ExitCode.UNEXPECTED_XML_STRUCTURE,
+                                  'Expected root to containt attribute language with value "IPPcode22".')
 
-        expected_order = 0
-        actual_order = 1
-        for child in root:
-            if child.tag != 'instruction':
-                print(f'ERROR: Unexpected XML-tag {child.tag}. Expected: instruction', file=sys.stderr)
-                exit(ExitCode.UNEXPECTED_XML_STRUCTURE.value)
-
-            attributes = list(child.attrib.keys())
-            if not ('order' in attributes) or not ('opcode' in attributes):
-                print('ERROR: Every instruction should contain opcode and order atrtibutes.', file=sys.stderr)
-                exit(ExitCode.UNEXPECTED_XML_STRUCTURE.value)
-
-            if int(child.attrib['order']) <= expected_order:
-                print(f'ERROR: Expected order to be bigger then {expected_order} but it was {child.attrib["order"]}.',
-                      file=sys.stderr)
-                exit(ExitCode.UNEXPECTED_XML_STRUCTURE.value)
-            child.attrib['order'] = actual_order
-
-            arg1 = False
-            arg2 = False
-            arg3 = False
-            for arg in child:
-                if arg.tag == 'arg1':
-                    arg1 = True
-                elif arg.tag == 'arg2':
-                    arg2 = True
-                elif arg.tag == 'arg3':
-                    arg3 = True
-                else:
-                    Interpreter.error(f'ERROR: Expected {arg.tag} to be arg1, arg2 or arg3.')
-                    exit(ExitCode.UNEXPECTED_XML_STRUCTURE.value)
-
-                arg_attrs = list(arg.attrib)
-                if not ('type' in arg_attrs):
-                    Interpreter.error(f'ERROR: {arg.tag} of instruction #{child.attrib["order"]} does not contain type info.')
-                    exit(ExitCode.UNEXPECTED_XML_STRUCTURE.value)
-
-            if (arg2 and not arg1) or (arg3 and not arg2) or (arg3 and not arg1):
-                Interpreter.error('missing argument: found arg2 and arg1 does not exist, or found arg3 and arg2 or arg1 does not exist.')
-                exit(ExitCode.UNEXPECTED_XML_STRUCTURE.value)
-
-            expected_order = int(child.attrib['order'])
-            actual_order += 1
+        return None
 
-    def print_stats(self, file: str, stats: list):
-        f = open(file, 'w', encoding='utf8')
-        hot = self.context.stats.calc_hot()
+    @staticmethod
+    def load_instruction(child: ET.Element) -> tuple:
+        if child.tag != 'instruction':
+            raise InterpretError(ExitCode.UNEXPECTED_XML_STRUCTURE,
+                                 f'Unexpected XML-tag {child.tag}. Expected: instruction')
 
-        for stat in stats:
-            if stat == 'insts':
-                print(f"{self.context.stats.insts}", file=f)
-            elif stat == 'hot':
-                print(f"{hot}", file=f)
-            elif stat == 'var':
-                print(f"{self.context.stats.vars}", file=f)
+        if 'order' not in child.attrib or 'opcode' not in child.attrib:
+            raise InterpretError(ExitCode.UNEXPECTED_XML_STRUCTURE,
+                                 'Every instruction should contain opcode and order atrtibutes.')
 
-        f.close()
+        try:
+            order = int(child.attrib['order'])
+        except ValueError:
+            raise InterpretError(ExitCode.UNEXPECTED_XML_STRUCTURE,
+                                 f'Order of the instruction must be an integer, but it was {child.attrib["order"]}.')
+
+        args = dict()
+        for arg in child:
+            if arg.tag not in ('arg1', 'arg2', 'arg3'):
+                raise InterpretError(ExitCode.UNEXPECTED_XML_STRUCTURE,
+                                     f'Expected {arg.tag} to be arg1, arg2 or arg3.')
 
+            if arg.tag in args:
+                raise InterpretError(ExitCode.UNEXPECTED_XML_STRUCTURE,
+                                     f'{arg.tag} of instruction with order {order} is defined twice.')
+
+            if 'type' not in arg.attrib:
+                raise InterpretError(ExitCode.UNEXPECTED_XML_STRUCTURE,
+                                     f'{arg.tag} of instruction with order {order} does not contain type info.')
+
+            args[arg.tag] = (arg.attrib['type'].lower(), arg.text)
+
+        if ('arg2' in args and 'arg1' not in args) or ('arg3' in args and 'arg2' not in args):
+            raise InterpretError(ExitCode.UNEXPECTED_XML_STRUCTURE,
+                                 'missing argument: found arg2 and arg1 does not exist, '
+                                 'or found arg3 and arg2 or arg1 does not exist.')
+
+        return child.attrib['opcode'].upper(), order, tuple(args[tag] for tag in sorted(args))
+
+    def print_stats(self, file: str, stats: list):
+        f = open(file, 'w', encoding='utf8')
+        f.write(self.result.stats.format(stats))
+        f.close()
@@ -0,0 +1,21 @@
+# Limits of one run of the program (--max-insts, --timeout, --max-stack, --max-call-depth), None means no limit.
+# They are checked by Context.check_limits() only when the execution goes back (jumps, calls and returns), which is
+# enough to stop every loop and recursion: code without backward jumps is at most as long as the program.
+class Limits:
+    # Number of checks between two readings of the clock
+    time_check_interval = 1000
+
+    def __init__(self, max_insts: int = None, timeout: float = None, max_stack: int = None,
+                 max_call_depth: int = None):
+        self.max_insts = max_insts
+        self.timeout = timeout
+        self.max_stack = max_stack
+        self.max_call_depth = max_call_depth
+
+    # Returns the limits of a run which requested the other limits, the lower value of every limit is used
+    def restrict(self, other: 'Limits') -> 'Limits':
+        def lower(value, other_value):
+            return value if other_value is None else other_value if value is None else min(value, other_value)
+
+        return Limits(lower(self.max_insts, other.max_insts), lower(self.timeout, other.timeout),
+                      lower(self.max_stack, other.max_stack), lower(self.max_call_depth, other.max_call_depth))
@@ -11,19 +11,19 @@ class LogicType(Enum):
 
 
 class LogicEvaluator:
+    funcs = {
+        LogicType.LT: lambda a, b: a < b,
+        LogicType.GT: lambda a, b: a > b,
+        LogicType.EQ: lambda a, b: a == b,
+        LogicType.AND: lambda a, b: a and b,
+        LogicType.OR: lambda a, b: a or b,
+        LogicType.NOT: lambda a, _: not a
+    }
+
     def __init__(self, ot: LogicType, value1, value2=None):
         self.v1 = value1
         self.v2 = value2
         self.type = ot
 
     def eval(self) -> bool:
-        funcs = {
-            LogicType.LT: lambda a, b: a < b,
-            LogicType.GT: lambda a, b: a > b,
-            LogicType.EQ: lambda a, b: a == b,
-            LogicType.AND: lambda a, b: a and b,
-            LogicType.OR: lambda a, b: a or b,
-            LogicType.NOT: lambda a, _: not a
-        }
-
-        return funcs[self.type](self.v1, self.v2)
+        return LogicEvaluator.funcs[self.type](self.v1, self.v2)
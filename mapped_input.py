@@ -0,0 +1,57 @@
+import io
+import mmap
+import os
+import stat
+
+
+# Input file mapped to memory, READ gets its lines without going through the text I/O layer
+class MappedInput:
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.pos = 0
+
+    @staticmethod
+    def map_file(path: str):
+        with open(path, 'rb') as f:
+            info = os.fstat(f.fileno())
+            if not stat.S_ISREG(info.st_mode):
+                return f.read()
+            if info.st_size == 0:
+                return b''
+
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # Maps regular files to memory, other files (pipes, devices) are read as a text stream
+    @staticmethod
+    def open(path: str):
+        if not stat.S_ISREG(os.stat(path).st_mode):
+            return io.open(path, 'r')
+
+        return MappedInput(MappedInput.map_file(path))
+
+    # Closes the mapping, the memory of the file can't be used afterwards
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+    def readline(self) -> str:
+        if self.pos >= len(self.buffer):
+            return ''
+
+        end = self.buffer.find(b'\n', self.pos)
+        end = len(self.buffer) if end == -1 else end + 1
+        line = self.buffer[self.pos:end]
+        self.pos = end
+
+        if line.endswith(b'\r\n'):
+            line = line[:-2] + b'\n'
+        return line.decode('utf8')
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        line = self.readline()
+        if line == '':
+            raise StopIteration
+        return line
@@ -0,0 +1,162 @@
+from superinstruction import Superinstruction
+
+
+# Peephole optimizer of a linked program (--optimize). It fuses common sequences of instructions into
+# superinstructions, threads chains of unconditional jumps and removes labels which don't have to be executed.
+# Statistics of all original instructions are kept: every removed instruction is counted by the instruction
+# which is executed instead of it.
+class Optimizer:
+    # Instructions which never continue with the next one
+    no_fall_through = ('JUMP', 'RETURN', 'EXIT')
+    # Instructions which continue with the next one only sometimes (or later, CALL after RETURN)
+    branches = ('JUMPIFEQ', 'JUMPIFNEQ', 'JUMPIFEQS', 'JUMPIFNEQS', 'CALL')
+
+    def __init__(self, instructions: list):
+        self.instructions = instructions
+        # Positions of targets of jumps and calls, keyed by the position of the jump
+        self.targets = dict()
+        # Removed instructions whose statistics are counted by the instruction, keyed by its position
+        self.extra = dict()
+        self.removed_labels = set()
+
+    def run(self) -> list:
+        for pos, i in enumerate(self.instructions):
+            if i.target is not None:
+                self.targets[pos] = i.target
+
+        self.thread_jumps()
+        self.find_removable_labels()
+        units = self.fuse()
+        self.count_removed_labels(units)
+        return self.build(units)
+
+    # JUMP to a label followed by another JUMP continues directly at the target of the last JUMP of the chain
+    def thread_jumps(self):
+        instructions = self.instructions
+        for pos, i in enumerate(instructions):
+            if i.opcode != 'JUMP':
+                continue
+
+            target = self.targets[pos]
+            skipped = []
+            visited = {pos}
+            while True:
+                next_pos = target + 1
+                while next_pos < len(instructions) and instructions[next_pos].opcode == 'LABEL':
+                    next_pos += 1
+
+                if next_pos == len(instructions) or instructions[next_pos].opcode != 'JUMP' or next_pos in visited:
+                    break
+
+                visited.add(next_pos)
+                skipped.extend(instructions[target + 1:next_pos + 1])
+                target = self.targets[next_pos]
+
+            self.targets[pos] = target
+            if skipped:
+                self.extra[pos] = skipped
+
+    # A jump continues after its label, so it executes only the labels which follow the target label. A label can be
+    # removed when it is executed only by falling through from an instruction which always continues with the next
+    # one and after unconditional jumps, both of them count the label instead.
+    def find_removable_labels(self):
+        jumps_to = dict()
+        for pos, target in self.targets.items():
+            label = target + 1
+            while label < len(self.instructions) and self.instructions[label].opcode == 'LABEL':
+                jumps_to.setdefault(label, []).append(self.instructions[pos].opcode)
+                label += 1
+
+        branch_before = False
+        for pos, i in enumerate(self.instructions):
+            if i.opcode == 'LABEL' and pos != 0 and not branch_before \
+                    and all(opcode == 'JUMP' for opcode in jumps_to.get(pos, [])):
+                self.removed_labels.add(pos)
+                continue
+
+            branch_before = i.opcode in Optimizer.branches
+
+    # Splits the remaining instructions to units executed by a single instruction, returns lists of their positions
+    def fuse(self) -> list:
+        units = []
+        pos = 0
+        while pos < len(self.instructions):
+            if pos in self.removed_labels:
+                pos += 1
+                continue
+
+            length = self.match(pos)
+            units.append(list(range(pos, pos + length)))
+            pos += length
+
+        return units
+
+    # Returns the length of the sequence starting at the position which can be fused
+    def match(self, pos: int) -> int:
+        opcodes = [i.opcode for i in self.instructions[pos:pos + 4]]
+        if len(opcodes) == 4 and opcodes[0] == 'PUSHS' and opcodes[1] == 'PUSHS' \
+                and opcodes[2] in Superinstruction.binary_operations and opcodes[3] == 'POPS':
+            return 4
+
+        if opcodes[0] == 'CREATEFRAME':
+            return self.match_frame_setup(pos)
+
+        return 1
+
+    # CREATEFRAME, definitions of temporary variables (and moves to them) and PUSHFRAME before a call are executed
+    # by one instruction
+    def match_frame_setup(self, pos: int) -> int:
+        length = 1
+        while pos + length < len(self.instructions):
+            i = self.instructions[pos + length]
+            if i.opcode == 'PUSHFRAME':
+                return length + 1
+            if i.opcode not in ('DEFVAR', 'MOVE') or i.args[0].frame != 'TF':
+                break
+            length += 1
+
+        return 1
+
+    # Statistics of removed labels are counted by the instruction before them and by jumps to the labels before them
+    def count_removed_labels(self, units: list):
+        unit_of = {unit[-1]: unit for unit in units}
+        for pos in sorted(self.removed_labels):
+            before = pos - 1
+            while before in self.removed_labels:
+                before -= 1
+
+            if self.instructions[before].opcode not in Optimizer.no_fall_through:
+                self.extra.setdefault(unit_of[before][0], []).append(self.instructions[pos])
+
+        for pos, target in self.targets.items():
+            if self.instructions[pos].opcode != 'JUMP':
+                continue
+
+            while target + 1 in self.removed_labels:
+                self.extra.setdefault(pos, []).append(self.instructions[target + 1])
+                target += 1
+
+    def build(self, units: list) -> list:
+        new_pos = {unit[0]: index for index, unit in enumerate(units)}
+
+        for pos, target in self.targets.items():
+            if target in self.removed_labels:
+                while target in self.removed_labels:
+                    target += 1
+                self.instructions[pos].target = new_pos.get(target, len(units)) - 1
+            else:
+                self.instructions[pos].target = new_pos[target]
+
+        result = []
+        for unit in units:
+            parts = [self.instructions[pos] for pos in unit]
+            if len(parts) == 1 and unit[0] not in self.extra:
+                result.append(parts[0])
+                continue
+
+            instruction = Superinstruction(parts)
+            for extra in self.extra.get(unit[0], []):
+                instruction.add_stats(extra)
+            result.append(instruction)
+
+        return result
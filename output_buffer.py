@@ -0,0 +1,23 @@
+# Collects the output of WRITE and passes it to the stream in large blocks
+class OutputBuffer:
+    def __init__(self, stream, line_buffered: bool = False, limit: int = 1 << 16):
+        self.stream = stream
+        self.line_buffered = line_buffered
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+
+    def write(self, text: str):
+        self.parts.append(text)
+        self.size += len(text)
+
+        if self.size >= self.limit or (self.line_buffered and '\n' in text):
+            self.flush()
+
+    def flush(self):
+        if len(self.parts) != 0:
+            self.stream.write(''.join(self.parts))
+            self.parts.clear()
+            self.size = 0
+
+        self.stream.flush()
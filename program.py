@@ -0,0 +1,176 @@
+import io
+
+from argument import Argument
+from cfg import ControlFlowGraph
+from codegen import CodeGenerator
+from context import Context
+from exit_code import ExitCode, InterpretError
+from execution_profile import Profile
+from instruction import Instruction
+from limits import Limits
+from optimizer import Optimizer
+from stats import Stats
+from tracer import Tracer
+from type_inference import TypeInference
+
+
+class ExecutionResult:
+    def __init__(self, exit_code: int, stats: Stats, finished: bool, stdout: str = None, stderr: str = None,
+                 limit_exceeded: bool = False):
+        self.exit_code = exit_code
+        self.stats = stats
+        self.finished = finished
+        # The run was stopped by a limit, the statistics are partial
+        self.limit_exceeded = limit_exceeded
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+# Loaded and linked program which can be executed any number of times, every run gets its own Context
+class Program:
+    def __init__(self, instructions: list):
+        self.instructions = instructions
+        # All loaded instructions, including unreachable code removed by remove_unreachable_code() (see records())
+        self.loaded_instructions = instructions
+        self.labels = dict()
+        self.globals = dict()
+        self.warnings = []
+        # Function of the first block of the compiled program (see compile())
+        self.code = None
+        # Tracer which records and compiles hot loops (see enable_tracing())
+        self.tracer = None
+
+        self.load_labels()
+        self.link_labels()
+        self.remove_unreachable_code()
+        self.layout_frames()
+        TypeInference(self.instructions).run()
+
+    # Creates the program from instruction records: (opcode, order, ((type, value), ...))
+    @staticmethod
+    def from_records(records) -> 'Program':
+        instructions = []
+        for opcode, order, args in records:
+            instruction = Instruction(opcode, order)
+            for arg_type, value in args:
+                instruction.add_arg(Argument(arg_type, value))
+
+            if not instruction.bind():
+                raise InterpretError(ExitCode.UNEXPECTED_XML_STRUCTURE, f'unknown opcode {instruction.opcode}.')
+
+            instructions.append(instruction)
+
+        return Program(instructions)
+
+    # Returns the records of the loaded program, a program created from them removes the same code and reports
+    # the same warnings
+    def records(self) -> tuple:
+        return tuple((i.opcode, i.order, tuple((a.type, a.value) for a in i.args)) for i in self.loaded_instructions)
+
+    def load_labels(self):
+        self.labels = dict()
+        for pos, i in enumerate(self.instructions):
+            if i.opcode == 'LABEL':
+                if i.args[0].value in self.labels.keys():
+                    raise InterpretError(ExitCode.SEMANTIC_ERROR, f'label {i.args[0].value} is defined twice.')
+
+                self.labels[i.args[0].value] = pos
+
+    def link_labels(self):
+        for i in self.instructions:
+            if not i.link(self.labels):
+                raise InterpretError(ExitCode.SEMANTIC_ERROR,
+                                     f'label {i.args[0].value} does not exist (instruction #{i.order}).')
+
+    # Removes basic blocks which can't be executed and links the remaining instructions again.
+    # Errors are reported with the order of the instruction, so removing instructions does not change them.
+    def remove_unreachable_code(self):
+        unreachable = ControlFlowGraph(self.instructions).unreachable()
+        if not unreachable:
+            return
+
+        removed = set()
+        for block in unreachable:
+            removed.update(range(block.start, block.end))
+            self.warnings.append(f'unreachable code (instructions #{self.instructions[block.start].order}'
+                                 f'-#{self.instructions[block.end - 1].order}) was removed.')
+
+        self.instructions = [i for pos, i in enumerate(self.instructions) if pos not in removed]
+        self.load_labels()
+        self.link_labels()
+
+    # Assigns every global variable its index in the global frame and creates the layout of frames for every
+    # CREATEFRAME. Temporary variables defined right after CREATEFRAME (before the frame can be replaced or
+    # the code can be entered from another place) get their indices in advance, others are added on DEFVAR.
+    def layout_frames(self):
+        layout = None
+        for i in self.instructions:
+            if i.opcode == 'CREATEFRAME':
+                i.layout = dict()
+                layout = i.layout
+            elif i.opcode in ('PUSHFRAME', 'POPFRAME', 'LABEL', 'RETURN') or i.opcode in Instruction.jumps:
+                layout = None
+
+            for arg in i.args:
+                if arg.frame == 'GF':
+                    arg.layout = self.globals
+                    arg.slot = self.globals.setdefault(arg.name, len(self.globals))
+                elif arg.frame == 'TF' and layout is not None:
+                    if i.opcode == 'DEFVAR':
+                        layout.setdefault(arg.name, len(layout))
+                    if arg.name in layout:
+                        arg.layout = layout
+                        arg.slot = layout[arg.name]
+
+    # Replaces the instructions with the output of the peephole optimizer
+    def optimize(self):
+        self.instructions = Optimizer(self.instructions).run()
+        self.load_labels()
+
+    # Compiles the program to Python functions, which are then used by all runs instead of the instructions
+    def compile(self):
+        self.code = CodeGenerator(self.instructions).compile()
+
+    # Runs the program by a Tracer, which compiles hot loops while the program is executed. Traces are kept
+    # in the program, so they are reused by the next runs.
+    def enable_tracing(self):
+        self.tracer = Tracer(self.instructions)
+
+    # Specializes the program for the run described by the profile: instructions which always had operands of the
+    # same type are quickened before the first execution and loops whose backward jump was taken often are traced
+    # from their first iteration (compiled programs keep their code, which calls the quickened handlers).
+    def apply_profile(self, profile: Profile):
+        if self.code is None and self.tracer is None:
+            self.enable_tracing()
+
+        for pos, i in enumerate(self.instructions):
+            for part in getattr(i, 'parts', [i]):
+                quick_type = profile.monomorphic_type(part.order)
+                if profile.count(part.order) >= Instruction.quicken_threshold and quick_type is not None \
+                        and quick_type in Instruction.quickened_types[part.opcode]:
+                    part.quick_type = quick_type
+                    part.quicken()
+
+            if self.tracer is not None and i.target is not None and i.target < pos and i.opcode in Tracer.backward_jumps \
+                    and profile.taken_count(i.order) >= Tracer.hot_loop_threshold:
+                self.tracer.counts[pos] = Tracer.hot_loop_threshold - 1
+
+    def execute(self, input_stream, output, error_output, stats: list = None,
+                line_buffered: bool = False, profile: Profile = None, limits: Limits = None) -> ExecutionResult:
+        ctx = Context(self, input_stream, output, error_output, stats is not None and 'var' in stats,
+                      line_buffered, profile, limits)
+        exit_code = ctx.execute()
+        if profile is not None:
+            profile.add_counts(ctx.stats.hot)
+
+        return ExecutionResult(exit_code, ctx.stats, ctx.finished, limit_exceeded=ctx.limit_exceeded)
+
+    # Runs the program in memory and returns its output instead of writing it to the standard streams
+    def run(self, input_data: str = '', stats: list = None, limits: Limits = None) -> ExecutionResult:
+        output = io.StringIO()
+        error_output = io.StringIO()
+
+        result = self.execute(io.StringIO(input_data), output, error_output, stats, limits=limits)
+        result.stdout = output.getvalue()
+        result.stderr = error_output.getvalue()
+        return result
@@ -0,0 +1,80 @@
+import hashlib
+import marshal
+import os
+import tempfile
+
+from exit_code import InterpretError
+from program import Program
+
+
+# Stores loaded programs as marshalled instruction records, so the XML does not have to be parsed again.
+# Every entry contains the version, the SHA-256 of the source and the records. Entries which don't belong to
+# the source or can't be loaded (corrupt or modified files) are cache misses.
+class ProgramCache:
+    def __init__(self, directory: str, version: str):
+        self.directory = directory
+        self.version = version
+
+    def path(self, source) -> str:
+        digest = hashlib.sha256(self.version.encode('utf8') + b'\0')
+        digest.update(source)
+        return os.path.join(self.directory, f'{digest.hexdigest()}.ippc')
+
+    def load(self, source) -> Program or None:
+        try:
+            with open(self.path(source), 'rb') as f:
+                version, source_hash, records = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+        if version != self.version or source_hash != hashlib.sha256(source).hexdigest() \
+                or not ProgramCache.valid_records(records):
+            return None
+
+        try:
+            return Program.from_records(records)
+        except (ValueError, TypeError, KeyError, InterpretError):
+            return None
+
+    # Checks that the records have the shape created by Program.records(): (opcode, order, ((type, value), ...))
+    @staticmethod
+    def valid_records(records) -> bool:
+        if type(records) is not tuple:
+            return False
+
+        last_order = 0
+        for record in records:
+            if type(record) is not tuple or len(record) != 3:
+                return False
+
+            opcode, order, args = record
+            if type(opcode) is not str or type(order) is not int or order <= last_order or type(args) is not tuple:
+                return False
+            last_order = order
+
+            for arg in args:
+                if type(arg) is not tuple or len(arg) != 2 or type(arg[0]) is not str \
+                        or not (arg[1] is None or type(arg[1]) is str):
+                    return False
+
+        return True
+
+    def store(self, source, program: Program):
+        data = marshal.dumps((self.version, hashlib.sha256(source).hexdigest(), program.records()))
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path(source))
+        except OSError:
+            # The temporary file is not needed, if it couldn't be written or moved to the cache
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
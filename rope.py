@@ -0,0 +1,107 @@
+from bisect import bisect_right
+
+from string_value import StringValue
+
+
+# Text shared by ropes created by appending to each other. Full chunks are stored in a list together with their
+# cumulative end offsets, short appends are collected in the tail, which is moved to the chunks when it gets long.
+# The text only grows, so every rope sees its own prefix of the buffer.
+class RopeBuffer:
+    __slots__ = ('chunks', 'ends', 'tail', 'length')
+
+    chunk_size = 256
+
+    def __init__(self, text: str):
+        self.chunks = [text]
+        self.ends = [len(text)]
+        self.tail = ''
+        self.length = len(text)
+
+    def append(self, text: str):
+        self.tail += text
+        self.length += len(text)
+        if len(self.tail) >= RopeBuffer.chunk_size:
+            self.chunks.append(self.tail)
+            self.ends.append(self.length)
+            self.tail = ''
+
+    def char(self, index: int) -> str:
+        if index >= self.ends[-1]:
+            return self.tail[index - self.ends[-1]]
+
+        chunk = bisect_right(self.ends, index)
+        return self.chunks[chunk][index - self.ends[chunk - 1] if chunk else index]
+
+    # Joins the chunks to one, so the text is built only once for all ropes of the buffer
+    def text(self, length: int) -> str:
+        if len(self.chunks) != 1 or self.tail:
+            text = ''.join(self.chunks) + self.tail
+            self.chunks = [text]
+            self.ends = [len(text)]
+            self.tail = ''
+
+        text = self.chunks[0]
+        return text if length == len(text) else text[:length]
+
+
+# Value of a long string built by CONCAT. Appending to the newest rope of the buffer does not copy the text, so
+# building a string in a loop is linear. The length is known without building the text and characters are found
+# in the chunks, the text is built (and cached) only when the whole value is needed (WRITE, comparisons).
+# Ropes behave like str for the instructions: len(), indexing and comparisons (see StringValue).
+class Rope(StringValue):
+    __slots__ = ('buffer', 'length', 'flat')
+
+    # Shorter results of CONCAT are ordinary strings
+    min_length = 256
+
+    def __init__(self, buffer: RopeBuffer, length: int):
+        self.buffer = buffer
+        self.length = length
+        self.flat = None
+
+    # Returns the concatenation of two string values (str or StringValue)
+    @staticmethod
+    def concat(left, right):
+        if type(right) is not str:
+            right = str(right)
+
+        if type(left) is Rope and left.length == left.buffer.length:
+            left.buffer.append(right)
+            return Rope(left.buffer, left.buffer.length)
+        elif type(left) is not str:
+            # Character buffers and ropes whose buffer was already extended by another rope are copied
+            left = str(left)
+
+        if len(left) + len(right) < Rope.min_length:
+            return left + right
+
+        buffer = RopeBuffer(left)
+        buffer.append(right)
+        return Rope(buffer, buffer.length)
+
+    def __str__(self):
+        if self.flat is None:
+            self.flat = self.buffer.text(self.length)
+        return self.flat
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if type(index) is not int or self.flat is not None:
+            return str(self)[index]
+
+        if index < 0:
+            index += self.length
+        if index < 0 or index >= self.length:
+            raise IndexError('string index out of range')
+
+        return self.buffer.char(index)
+
+    def __eq__(self, other):
+        if type(other) is Rope and other.buffer is self.buffer:
+            return other.length == self.length
+
+        return super().__eq__(other)
+
+    __hash__ = StringValue.__hash__
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import socketserver
+import stat
+
+from exit_code import InterpretError
+from interpreter import Interpreter
+from limits import Limits
+
+# Programs parsed by the current worker process, keyed by the SHA-256 of their source
+programs = dict()
+PROGRAMS_CACHE_SIZE = 256
+
+
+# Runs the request with the limits of the server (--max-insts, ...), the request can only lower them
+def run_request(request: dict, limits: Limits = None) -> dict:
+    source = request['source'].encode('utf8')
+    stats = request.get('stats') or None
+    if request.get('limits') is not None:
+        requested = Limits(**request['limits'])
+        limits = requested if limits is None else limits.restrict(requested)
+    key = hashlib.sha256(source).hexdigest()
+
+    try:
+        program = programs.get(key)
+        if program is None:
+            program = Interpreter.parse_source(source)
+            if len(programs) >= PROGRAMS_CACHE_SIZE:
+                del programs[next(iter(programs))]
+            programs[key] = program
+    except InterpretError as e:
+        return {'stdout': '', 'stderr': f'ERROR: {e.message}\n', 'exit_code': e.code.value, 'stats': None}
+
+    result = program.run(request.get('input') or '', stats, limits)
+    # Statistics of runs stopped by a limit are partial, but they are returned as well (like the stats file)
+    stats_written = result.finished or result.limit_exceeded
+    return {
+        'stdout': result.stdout,
+        'stderr': result.stderr,
+        'exit_code': result.exit_code,
+        'stats': result.stats.format(stats) if stats is not None and stats_written else None
+    }
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    limit_names = {'max_insts', 'timeout', 'max_stack', 'max_call_depth'}
+
+    # Raises ValueError, if the request does not have the expected fields
+    @staticmethod
+    def validate(request):
+        if not isinstance(request, dict) or not isinstance(request.get('source'), str):
+            raise ValueError('request must be an object with the source field')
+        if request.get('input') is not None and not isinstance(request['input'], str):
+            raise ValueError('input must be a string')
+        stats = request.get('stats')
+        if stats is not None and (not isinstance(stats, list) or not all(isinstance(s, str) for s in stats)):
+            raise ValueError('stats must be a list of strings')
+        limits = request.get('limits')
+        limit_names = RequestHandler.limit_names
+        if limits is not None:
+            if not isinstance(limits, dict) or not set(limits) <= limit_names:
+                raise ValueError(f'limits must be an object with the fields {", ".join(sorted(limit_names))}')
+            for name, value in limits.items():
+                valid_type = (int, float) if name == 'timeout' else int
+                if value is not None and (isinstance(value, bool) or not isinstance(value, valid_type) or value < 0):
+                    raise ValueError(f'{name} must be a non-negative number')
+
+    # Every line is one JSON request:
+    # {"source": "<xml>", "input": "...", "stats": ["insts", "hot", "var"], "limits": {"max_insts": 1000, ...}}
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+
+            try:
+                request = json.loads(line)
+                RequestHandler.validate(request)
+            except ValueError as e:
+                response = {'error': f'bad request: {e}'}
+            else:
+                try:
+                    response = self.server.pool.apply(run_request, (request, self.server.limits))
+                except Exception as e:
+                    # The connection must survive errors of a single request
+                    response = {'error': f'request failed: {type(e).__name__}: {e}'}
+
+            self.wfile.write(json.dumps(response).encode('utf8') + b'\n')
+            self.wfile.flush()
+
+
+class Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, workers: int = None, limits: Limits = None):
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.remove(path)
+
+        super().__init__(path, RequestHandler)
+        os.chmod(path, 0o600)
+        self.path = path
+        self.limits = limits
+        self.pool = multiprocessing.Pool(workers)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.terminate()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -22,3 +22,16 @@ class Stats:
                 min_order = key[1]
 
         return min_order
+
+    # Returns content of the stats file with the statistics in the requested order
+    def format(self, stats: list) -> str:
+        result = ''
+        for stat in stats:
+            if stat == 'insts':
+                result += f"{self.insts}\n"
+            elif stat == 'hot':
+                result += f"{self.calc_hot()}\n"
+            elif stat == 'var':
+                result += f"{self.vars}\n"
+
+        return result
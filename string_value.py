@@ -0,0 +1,28 @@
+# Base of string values which are not stored as str (Rope, CharBuffer). The text is built by __str__(), comparisons
+# work with str and other string values, so instructions don't have to distinguish them.
+class StringValue:
+    __slots__ = ()
+
+    def __repr__(self):
+        return repr(str(self))
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __eq__(self, other):
+        if isinstance(other, (str, StringValue)):
+            return len(other) == len(self) and str(self) == str(other)
+
+        return NotImplemented
+
+    def __lt__(self, other):
+        return str(self) < str(other) if isinstance(other, (str, StringValue)) else NotImplemented
+
+    def __gt__(self, other):
+        return str(self) > str(other) if isinstance(other, (str, StringValue)) else NotImplemented
+
+    def __le__(self, other):
+        return str(self) <= str(other) if isinstance(other, (str, StringValue)) else NotImplemented
+
+    def __ge__(self, other):
+        return str(self) >= str(other) if isinstance(other, (str, StringValue)) else NotImplemented
@@ -0,0 +1,105 @@
+from arithmetics import ArithmeticEvaluator, ArithmeticsType
+from context import Context
+from exit_code import InterpretError
+from instruction import Instruction
+from logic import LogicEvaluator, LogicType
+
+
+# Instruction created by the optimizer from one or more original instructions (parts). It is executed
+# by a single dispatch, but it counts the statistics of all original instructions it replaces, including
+# the statistics of removed instructions (labels, jumps skipped by jump threading).
+class Superinstruction(Instruction):
+    # Evaluates the operation of a binary stack instruction, returns the type and the value of the result
+    binary_operations = {
+        'ADDS': lambda i, ctx, a, b: (a.type, i.calc_arithmetics(a, b, ctx, ArithmeticsType.ADD)),
+        'SUBS': lambda i, ctx, a, b: (a.type, i.calc_arithmetics(a, b, ctx, ArithmeticsType.SUB)),
+        'MULS': lambda i, ctx, a, b: (a.type, i.calc_arithmetics(a, b, ctx, ArithmeticsType.MUL)),
+        'IDIVS': lambda i, ctx, a, b: (a.type, i.calc_arithmetics(a, b, ctx, ArithmeticsType.IDIV)),
+        'LTS': lambda i, ctx, a, b: ('bool', i.calc_logic(a, b, ctx, LogicType.LT, ['int', 'float', 'string', 'bool'])),
+        'GTS': lambda i, ctx, a, b: ('bool', i.calc_logic(a, b, ctx, LogicType.GT, ['int', 'float', 'string', 'bool'])),
+        'EQS': lambda i, ctx, a, b: ('bool', i.calc_logic(a, b, ctx, LogicType.EQ, ['int', 'float', 'string', 'bool', 'nil'])),
+        'ANDS': lambda i, ctx, a, b: ('bool', i.calc_logic(a, b, ctx, LogicType.AND, ['bool'])),
+        'ORS': lambda i, ctx, a, b: ('bool', i.calc_logic(a, b, ctx, LogicType.OR, ['bool'])),
+    }
+
+    # Binary stack instructions with operands of the same allowed type are evaluated directly:
+    # (allowed types, operation, type of the result or None for the type of the operands)
+    quick_operations = {
+        'ADDS': (('int', 'float'), ArithmeticEvaluator.funcs[ArithmeticsType.ADD], None),
+        'SUBS': (('int', 'float'), ArithmeticEvaluator.funcs[ArithmeticsType.SUB], None),
+        'MULS': (('int', 'float'), ArithmeticEvaluator.funcs[ArithmeticsType.MUL], None),
+        'IDIVS': (('int', 'float'), ArithmeticEvaluator.funcs[ArithmeticsType.IDIV], None),
+        'LTS': (('int', 'float', 'string', 'bool'), LogicEvaluator.funcs[LogicType.LT], 'bool'),
+        'GTS': (('int', 'float', 'string', 'bool'), LogicEvaluator.funcs[LogicType.GT], 'bool'),
+        'EQS': (('int', 'float', 'string', 'bool', 'nil'), LogicEvaluator.funcs[LogicType.EQ], 'bool'),
+        'ANDS': (('bool',), LogicEvaluator.funcs[LogicType.AND], 'bool'),
+        'ORS': (('bool',), LogicEvaluator.funcs[LogicType.OR], 'bool'),
+    }
+
+    def __init__(self, parts: list):
+        super().__init__('+'.join(p.opcode for p in parts), parts[0].order)
+        self.parts = parts
+        self.args = parts[0].args
+        self.target = parts[0].target
+        self.layout = parts[0].layout
+        self.stats_key = parts[0].stats_key
+        self.stats_keys = [p.stats_key for p in parts]
+        self.insts_count = sum(1 for p in parts if p.counts_as_inst)
+
+        if len(parts) == 1:
+            self.handler = self.single
+        elif len(parts) == 4 and parts[2].opcode in Superinstruction.binary_operations:
+            self.quick_operation = Superinstruction.quick_operations[parts[2].opcode]
+            self.handler = self.binary_stack_operation
+        else:
+            self.handler = self.sequence
+
+    # Adds statistics of an instruction which is executed together with this one
+    def add_stats(self, instruction: Instruction):
+        self.stats_keys.append(instruction.stats_key)
+        if instruction.counts_as_inst:
+            self.insts_count += 1
+
+    def update_stats(self, ctx: Context):
+        hot = ctx.stats.hot
+        for key in self.stats_keys:
+            hot[key] = hot.get(key, 0) + 1
+
+        ctx.stats.insts += self.insts_count
+
+    # PUSHS a; PUSHS b; <binary stack instruction>; POPS x without storing the values to the data stack
+    def binary_stack_operation(self, ctx: Context):
+        push1, push2, operation, pops = self.parts
+        part = push1
+        try:
+            sym1 = ctx.get_variable_from_arg(push1.args[0])
+            part = push2
+            sym2 = ctx.get_variable_from_arg(push2.args[0])
+            part = operation
+            allowed_types, function, result_type = self.quick_operation
+            if sym1.type == sym2.type and sym1.type in allowed_types \
+                    and (sym2.value != 0 or operation.opcode != 'IDIVS'):
+                result = function(sym1.value, sym2.value)
+                if result_type is None:
+                    result_type = sym1.type
+            else:
+                result_type, result = Superinstruction.binary_operations[operation.opcode](operation, ctx, sym1, sym2)
+            part = pops
+            ctx.set_variable(pops.args[0], result_type, result)
+        except InterpretError as e:
+            e.order = part.order
+            raise
+
+    # The handler of the instruction is looked up on every execution, because it can be replaced (see quicken())
+    def single(self, ctx: Context):
+        self.parts[0].handler(ctx)
+
+    # Executes the parts one after another
+    def sequence(self, ctx: Context):
+        part = None
+        try:
+            for part in self.parts:
+                part.handler(ctx)
+        except InterpretError as e:
+            e.order = part.order
+            raise
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Program which uses frames, calls, the data stack, strings, input and has an unreachable block. Every iteration
+# of the loop moves the counter through temporaries, doubles it on the stack and passes it to a function.
+SAMPLE = [
+    ('DEFVAR', [('var', 'GF@i')]),
+    ('MOVE', [('var', 'GF@i'), ('int', '0')]),
+    ('DEFVAR', [('var', 'GF@s')]),
+    ('MOVE', [('var', 'GF@s'), ('string', '')]),
+    ('DEFVAR', [('var', 'GF@a')]),
+    ('DEFVAR', [('var', 'GF@b')]),
+    ('DEFVAR', [('var', 'GF@line')]),
+    ('READ', [('var', 'GF@line'), ('type', 'string')]),
+    ('LABEL', [('label', 'loop')]),
+    ('MOVE', [('var', 'GF@a'), ('var', 'GF@i')]),
+    ('MOVE', [('var', 'GF@b'), ('var', 'GF@a')]),
+    ('PUSHS', [('var', 'GF@b')]),
+    ('PUSHS', [('int', '2')]),
+    ('MULS', []),
+    ('POPS', [('var', 'GF@a')]),
+    ('CREATEFRAME', []),
+    ('DEFVAR', [('var', 'TF@x')]),
+    ('MOVE', [('var', 'TF@x'), ('var', 'GF@a')]),
+    ('PUSHFRAME', []),
+    ('CALL', [('label', 'f')]),
+    ('POPFRAME', []),
+    ('ADD', [('var', 'GF@i'), ('var', 'GF@i'), ('int', '1')]),
+    ('JUMPIFNEQ', [('label', 'loop'), ('var', 'GF@i'), ('int', '50')]),
+    ('JUMP', [('label', 'end')]),
+    ('LABEL', [('label', 'dead')]),
+    ('WRITE', [('string', 'dead')]),
+    ('LABEL', [('label', 'end')]),
+    ('WRITE', [('var', 'GF@s')]),
+    ('WRITE', [('var', 'GF@line')]),
+    ('JUMP', [('label', 'done')]),
+    ('LABEL', [('label', 'f')]),
+    ('CONCAT', [('var', 'GF@s'), ('var', 'GF@s'), ('string', '\\032')]),
+    ('ADD', [('var', 'LF@x'), ('var', 'LF@x'), ('int', '1')]),
+    ('WRITE', [('var', 'LF@x')]),
+    ('RETURN', []),
+    ('LABEL', [('label', 'done')]),
+]
+
+
+def program_xml(code: list) -> bytes:
+    xml = ['<?xml version="1.0" encoding="UTF-8"?>', '<program language="IPPcode22">']
+    for order, (opcode, args) in enumerate(code, 1):
+        xml.append(f'<instruction order="{order}" opcode="{opcode}">')
+        for index, (arg_type, value) in enumerate(args, 1):
+            xml.append(f'<arg{index} type="{arg_type}">{value}</arg{index}>')
+        xml.append('</instruction>')
+    xml.append('</program>')
+    return '\n'.join(xml).encode('utf8')
+
+
+class Run:
+    def __init__(self, exit_code: int, stdout: str, stderr: str, stats: str or None):
+        self.exit_code = exit_code
+        self.stdout = stdout
+        self.stderr = stderr
+        self.stats = stats
+
+
+# Runs interpret.py with the source and the input, all statistics are written to a stats file which is returned
+def run_interpreter(source: bytes, *flags: str, input_data: str = 'input\n') -> Run:
+    with tempfile.TemporaryDirectory() as directory:
+        source_path = os.path.join(directory, 'source.xml')
+        input_path = os.path.join(directory, 'input.txt')
+        stats_path = os.path.join(directory, 'stats.txt')
+        with open(source_path, 'wb') as f:
+            f.write(source)
+        with open(input_path, 'w', encoding='utf8') as f:
+            f.write(input_data)
+
+        process = subprocess.run([sys.executable, os.path.join(ROOT, 'interpret.py'), '--source', source_path,
+                                  '--input', input_path, '--stats', stats_path, '--insts', '--hot', '--vars',
+                                  *flags], capture_output=True, encoding='utf8')
+
+        stats = None
+        if os.path.exists(stats_path):
+            with open(stats_path, encoding='utf8') as f:
+                stats = f.read()
+
+        return Run(process.returncode, process.stdout, process.stderr, stats)
@@ -0,0 +1,53 @@
+import unittest
+
+from helpers import SAMPLE, program_xml, run_interpreter
+
+# Fused sequences (see Optimizer) with errors in different parts
+ERRORS = [
+    [
+        ('DEFVAR', [('var', 'GF@a')]),
+        ('PUSHS', [('int', '1')]),
+        ('PUSHS', [('string', 'x')]),
+        ('ADDS', []),
+        ('POPS', [('var', 'GF@a')]),
+    ],
+    [
+        ('DEFVAR', [('var', 'GF@a')]),
+        ('PUSHS', [('int', '1')]),
+        ('PUSHS', [('int', '2')]),
+        ('ADDS', []),
+        ('POPS', [('var', 'GF@b')]),
+    ],
+    [
+        ('DEFVAR', [('var', 'GF@a')]),
+        ('CREATEFRAME', []),
+        ('DEFVAR', [('var', 'TF@x')]),
+        ('MOVE', [('var', 'TF@x'), ('var', 'GF@a')]),
+        ('PUSHFRAME', []),
+    ],
+]
+
+
+class CodeGeneratorTest(unittest.TestCase):
+    def assertSameRun(self, source: bytes, *flags: str):
+        expected = run_interpreter(source)
+        run = run_interpreter(source, *flags)
+        self.assertEqual(run.exit_code, expected.exit_code, run.stderr)
+        self.assertEqual(run.stdout, expected.stdout)
+        self.assertEqual(run.stderr, expected.stderr)
+        self.assertEqual(run.stats, expected.stats)
+
+    def test_compiled_program(self):
+        for flags in (['--compile'], ['--optimize', '--compile']):
+            with self.subTest(flags=flags):
+                self.assertSameRun(program_xml(SAMPLE), *flags)
+
+    # Parts of superinstructions are generated one by one, errors are reported with the order of the part
+    def test_errors_in_superinstructions(self):
+        for code in ERRORS:
+            with self.subTest(code=code):
+                self.assertSameRun(program_xml(code), '--optimize', '--compile')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from helpers import SAMPLE, program_xml, run_interpreter
+from exit_code import ExitCode
+from limits import Limits
+from server import run_request
+
+# Infinite loop which writes the counter in every iteration
+ENDLESS = [
+    ('DEFVAR', [('var', 'GF@i')]),
+    ('MOVE', [('var', 'GF@i'), ('int', '0')]),
+    ('LABEL', [('label', 'loop')]),
+    ('ADD', [('var', 'GF@i'), ('var', 'GF@i'), ('int', '1')]),
+    ('WRITE', [('var', 'GF@i')]),
+    ('JUMP', [('label', 'loop')]),
+]
+
+
+class LimitsTest(unittest.TestCase):
+    # The limit is checked on the backward jump, the run stops after the first iteration which exceeds it
+    def test_max_insts_writes_partial_stats(self):
+        run = run_interpreter(program_xml(ENDLESS), '--max-insts', '100')
+        self.assertEqual(run.exit_code, ExitCode.LIMIT_EXCEEDED.value)
+        self.assertEqual(run.stdout, ''.join(str(i) for i in range(1, 34)))
+        self.assertEqual(run.stats, '101\n4\n1\n')
+        self.assertIn('limit of executed instructions (100)', run.stderr)
+
+        for flags in (['--optimize'], ['--compile'], ['--trace']):
+            with self.subTest(flags=flags):
+                limited = run_interpreter(program_xml(ENDLESS), '--max-insts', '100', *flags)
+                self.assertEqual(limited.exit_code, ExitCode.LIMIT_EXCEEDED.value)
+                self.assertIsNotNone(limited.stats)
+
+    def test_limits_which_are_not_exceeded(self):
+        source = program_xml(SAMPLE)
+        expected = run_interpreter(source)
+        run = run_interpreter(source, '--max-insts', '100000', '--timeout', '60', '--max-stack', '2',
+                              '--max-call-depth', '1')
+        self.assertEqual(run.exit_code, expected.exit_code, run.stderr)
+        self.assertEqual(run.stdout, expected.stdout)
+        self.assertEqual(run.stats, expected.stats)
+
+    # Requests of the server use the limits of the server, they can only lower them
+    def test_server_limits(self):
+        expected = run_interpreter(program_xml(ENDLESS), '--max-insts', '100')
+        for server_limit, request_limit in ((100, None), (100, 1000), (1000, 100), (None, 100)):
+            with self.subTest(server_limit=server_limit, request_limit=request_limit):
+                request = {'source': program_xml(ENDLESS).decode('utf8'), 'stats': ['insts', 'hot', 'var']}
+                if request_limit is not None:
+                    request['limits'] = {'max_insts': request_limit}
+                limits = None if server_limit is None else Limits(max_insts=server_limit)
+                response = run_request(request, limits)
+                self.assertEqual(response['exit_code'], expected.exit_code)
+                self.assertEqual(response['stdout'], expected.stdout)
+                self.assertEqual(response['stats'], expected.stats)
+
+
+if __name__ == '__main__':
+    unittest.main()
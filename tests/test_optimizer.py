@@ -0,0 +1,90 @@
+import unittest
+
+from helpers import SAMPLE, program_xml, run_interpreter
+from interpreter import Interpreter
+
+# Loop with a chain of jumps and labels which are removed by the optimizer
+JUMPS = [
+    ('DEFVAR', [('var', 'GF@i')]),
+    ('MOVE', [('var', 'GF@i'), ('int', '0')]),
+    ('LABEL', [('label', 'top')]),
+    ('LABEL', [('label', 'top2')]),
+    ('ADD', [('var', 'GF@i'), ('var', 'GF@i'), ('int', '1')]),
+    ('JUMPIFEQ', [('label', 'out'), ('var', 'GF@i'), ('int', '30')]),
+    ('JUMP', [('label', 'j1')]),
+    ('LABEL', [('label', 'j1')]),
+    ('LABEL', [('label', 'j1b')]),
+    ('JUMP', [('label', 'j2')]),
+    ('LABEL', [('label', 'j2')]),
+    ('JUMP', [('label', 'top')]),
+    ('LABEL', [('label', 'out')]),
+    ('WRITE', [('var', 'GF@i')]),
+]
+
+
+# PUSHS a; PUSHS b; <operation>; POPS GF@r followed by WRITE GF@r
+def stack_operation(operation: str, a: tuple, b: tuple) -> list:
+    return [
+        ('DEFVAR', [('var', 'GF@r')]),
+        ('PUSHS', [a]),
+        ('PUSHS', [b]),
+        (operation, []),
+        ('POPS', [('var', 'GF@r')]),
+        ('WRITE', [('var', 'GF@r')]),
+    ]
+
+
+class OptimizerTest(unittest.TestCase):
+    def assertSameRun(self, source: bytes):
+        expected = run_interpreter(source)
+        run = run_interpreter(source, '--optimize')
+        self.assertEqual(run.exit_code, expected.exit_code, run.stderr)
+        self.assertEqual(run.stdout, expected.stdout)
+        self.assertEqual(run.stderr, expected.stderr)
+        self.assertEqual(run.stats, expected.stats)
+
+    def test_statistics_are_kept(self):
+        for code in (SAMPLE, JUMPS):
+            with self.subTest(code=code):
+                self.assertSameRun(program_xml(code))
+
+    def test_jump_threading(self):
+        program = Interpreter.parse_source(program_xml(JUMPS))
+        program.optimize()
+        jump = next(i for i in program.instructions if i.opcode == 'JUMP')
+        self.assertEqual(jump.order, 7)
+        self.assertEqual(program.instructions[jump.target + 1].order, 5)
+        self.assertFalse(any(i.opcode == 'LABEL' and i.order in (4, 8, 9, 11) for i in program.instructions))
+
+    # Operands of the same type are evaluated directly, the others (and division by zero) by the instruction
+    def test_binary_stack_operations(self):
+        operands = [
+            (('int', '7'), ('int', '2')),
+            (('int', '7'), ('int', '0')),
+            (('float', '0x1.8p+1'), ('float', '0x1p+0')),
+            (('string', 'a'), ('string', 'b')),
+            (('bool', 'true'), ('bool', 'false')),
+            (('nil', 'nil'), ('nil', 'nil')),
+            (('int', '1'), ('string', 'b')),
+            (('int', '1'), ('nil', 'nil')),
+        ]
+        for operation in ('ADDS', 'SUBS', 'MULS', 'IDIVS', 'LTS', 'GTS', 'EQS', 'ANDS', 'ORS'):
+            for a, b in operands:
+                with self.subTest(operation=operation, a=a, b=b):
+                    source = program_xml(stack_operation(operation, a, b))
+                    expected = Interpreter.parse_source(source).run('', ['insts', 'hot'])
+                    program = Interpreter.parse_source(source)
+                    program.optimize()
+                    result = program.run('', ['insts', 'hot'])
+                    self.assertEqual(result.exit_code, expected.exit_code)
+                    self.assertEqual(result.stdout, expected.stdout)
+                    self.assertEqual(result.stderr, expected.stderr)
+                    # Statistics are written only for finished runs
+                    self.assertEqual(result.finished, expected.finished)
+                    if expected.finished:
+                        self.assertEqual(result.stats.format(['insts', 'hot']),
+                                         expected.stats.format(['insts', 'hot']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import hashlib
+import marshal
+import os
+import tempfile
+import unittest
+
+from helpers import SAMPLE, program_xml, run_interpreter
+from interpreter import Interpreter
+from program_cache import ProgramCache
+
+
+class ProgramCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.source = program_xml(SAMPLE)
+        self.expected = run_interpreter(self.source)
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ProgramCache(self.directory.name, Interpreter.version)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertSameRun(self, run):
+        self.assertEqual(run.exit_code, self.expected.exit_code, run.stderr)
+        self.assertEqual(run.stdout, self.expected.stdout)
+        self.assertEqual(run.stats, self.expected.stats)
+
+    def write_entry(self, data: bytes):
+        with open(self.cache.path(self.source), 'wb') as f:
+            f.write(data)
+
+    def test_miss_and_hit(self):
+        self.assertEqual(self.expected.exit_code, 0, self.expected.stderr)
+        self.assertSameRun(run_interpreter(self.source, '--cache', self.directory.name))
+        self.assertTrue(os.path.exists(self.cache.path(self.source)))
+        self.assertIsNotNone(self.cache.load(self.source))
+        self.assertSameRun(run_interpreter(self.source, '--cache', self.directory.name))
+
+    # Unreachable code is removed from the cached program again, so --warnings reports it on every run
+    def test_hit_reports_warnings(self):
+        expected = run_interpreter(self.source, '--warnings')
+        self.assertIn('unreachable code', expected.stderr)
+        for _ in range(2):
+            run = run_interpreter(self.source, '--warnings', '--cache', self.directory.name)
+            self.assertEqual(run.stderr, expected.stderr)
+            self.assertEqual(run.stdout, expected.stdout)
+            self.assertEqual(run.stats, expected.stats)
+
+    # Entries which can't be loaded or don't belong to the source are ignored and replaced
+    def test_invalid_entries_are_misses(self):
+        source_hash = hashlib.sha256(self.source).hexdigest()
+        other = program_xml([('WRITE', [('string', 'other')])])
+        entries = [
+            b'garbage',
+            marshal.dumps(('1.0', source_hash, ())),
+            marshal.dumps((Interpreter.version, source_hash, 'records')),
+            marshal.dumps((Interpreter.version, source_hash, (('WRITE', 1),))),
+            marshal.dumps((Interpreter.version, source_hash, (('WRITE', 1, (('string', 1),)),))),
+            marshal.dumps((Interpreter.version, source_hash, (('NOSUCHOPCODE', 1, ()),))),
+            marshal.dumps((Interpreter.version, source_hash, (('LABEL', 1, (('label', 'a'),)),
+                                                              ('LABEL', 2, (('label', 'a'),))))),
+            marshal.dumps((Interpreter.version, hashlib.sha256(other).hexdigest(),
+                           Interpreter.parse_source(other).records())),
+        ]
+
+        for entry in entries:
+            with self.subTest(entry=entry):
+                self.write_entry(entry)
+                self.assertIsNone(self.cache.load(self.source))
+                self.assertSameRun(run_interpreter(self.source, '--cache', self.directory.name))
+                self.assertIsNotNone(self.cache.load(self.source))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from helpers import SAMPLE, program_xml, run_interpreter
+from exit_code import ExitCode
+from server import Server
+
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.server = Server(os.path.join(self.directory.name, 'server.sock'), 1)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.connect(self.server.path)
+        self.stream = self.connection.makefile('rwb')
+
+    def tearDown(self):
+        self.stream.close()
+        self.connection.close()
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def request(self, line: bytes) -> dict:
+        self.stream.write(line + b'\n')
+        self.stream.flush()
+        return json.loads(self.stream.readline())
+
+    def test_responses_match_the_interpreter(self):
+        programs = [
+            program_xml(SAMPLE),
+            program_xml([('WRITE', [('var', 'GF@x')])]),
+            program_xml([('ADD', [('var', 'GF@x'), ('int', '1'), ('string', 'a')])]),
+            program_xml([('EXIT', [('int', '7')])]),
+            b'<program language="IPPcode22"><instruction order="1" opcode="WRITE"></program>',
+            program_xml([('JUMP', [('label', 'nowhere')])]),
+        ]
+        for source in programs:
+            with self.subTest(source=source):
+                expected = run_interpreter(source)
+                response = self.request(json.dumps({'source': source.decode('utf8'), 'input': 'input\n',
+                                                    'stats': ['insts', 'hot', 'var']}).encode('utf8'))
+                self.assertEqual(response['exit_code'], expected.exit_code)
+                self.assertEqual(response['stdout'], expected.stdout)
+                self.assertEqual(response['stderr'], expected.stderr)
+                self.assertEqual(response['stats'], expected.stats)
+
+    # Invalid requests get an error and the connection is kept for the next requests
+    def test_bad_requests(self):
+        requests = [
+            b'not json',
+            b'[]',
+            b'{"input": ""}',
+            b'{"source": "", "input": 5}',
+            b'{"source": "", "stats": "insts"}',
+            b'{"source": "", "limits": {"max_insts": -1}}',
+            b'{"source": "", "limits": {"memory": 1}}',
+        ]
+        for line in requests:
+            with self.subTest(line=line):
+                self.assertIn('error', self.request(line))
+
+        response = self.request(json.dumps({'source': program_xml(SAMPLE).decode('utf8')}).encode('utf8'))
+        self.assertEqual(response['exit_code'], ExitCode.OK.value)
+        self.assertIsNone(response['stats'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interpreter import Interpreter
+from tracer import Tracer
+
+
+def loop_program(iterations: int) -> bytes:
+    code = [
+        ('DEFVAR', [('var', 'GF@i')]),
+        ('MOVE', [('var', 'GF@i'), ('int', '0')]),
+        ('LABEL', [('label', 'loop')]),
+        ('ADD', [('var', 'GF@i'), ('var', 'GF@i'), ('int', '1')]),
+        ('JUMPIFNEQ', [('label', 'loop'), ('var', 'GF@i'), ('int', str(iterations))]),
+        ('WRITE', [('var', 'GF@i')]),
+    ]
+    xml = ['<?xml version="1.0" encoding="UTF-8"?>', '<program language="IPPcode22">']
+    for order, (opcode, args) in enumerate(code, 1):
+        xml.append(f'<instruction order="{order}" opcode="{opcode}">')
+        for index, (arg_type, value) in enumerate(args, 1):
+            xml.append(f'<arg{index} type="{arg_type}">{value}</arg{index}>')
+        xml.append('</instruction>')
+    xml.append('</program>')
+    return '\n'.join(xml).encode('utf8')
+
+
+class TracerTest(unittest.TestCase):
+    # Traces are kept in the program and reused, every run must give the same result
+    def test_traced_program_runs_repeatedly(self):
+        for iterations in (Tracer.hot_loop_threshold, Tracer.hot_loop_threshold + 1, 200):
+            program = Interpreter.parse_source(loop_program(iterations))
+            program.enable_tracing()
+            for _ in range(4):
+                result = program.run('', ['insts'])
+                self.assertEqual(result.exit_code, 0, result.stderr)
+                self.assertEqual(result.stdout, str(iterations))
+                self.assertEqual(result.stats.insts, 3 + 2 * iterations)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,219 @@
+from codegen import CodeGenerator
+from context import Context
+from instruction import Instruction
+
+
+# Compiled path through one iteration of a loop. The function executes the iteration again and again until a guard
+# (type of an operand or direction of a conditional jump) fails, then it leaves the loop by a side exit.
+class Trace:
+    def __init__(self, instructions: list):
+        # Statistics of the instructions of the path, side exits count only the executed ones
+        self.keys = [list(i.stats_keys) if hasattr(i, 'stats_keys') else [i.stats_key] for i in instructions]
+        self.insts = [i.insts_count if hasattr(i, 'stats_keys') else int(i.counts_as_inst) for i in instructions]
+        self.function = None
+
+    def __call__(self, ctx: Context):
+        self.function(ctx)
+
+    # Counts the first `count` instructions of the path and continues with the instruction at the position
+    def side_exit(self, ctx: Context, count: int, next_pos: int):
+        hot = ctx.stats.hot
+        for keys in self.keys[:count]:
+            for key in keys:
+                hot[key] = hot.get(key, 0) + 1
+
+        ctx.stats.insts += sum(self.insts[:count])
+        ctx.current_pos = next_pos
+
+
+# Tracing execution (--trace). Backward jumps are counted and when one of them gets hot, the instructions executed
+# in the next iteration of its loop are recorded together with the types of their operands and directions of
+# conditional jumps. The recorded path is compiled to a Trace, which is then executed every time the jump is taken.
+class Tracer:
+    # Number of executions of a backward jump after which its loop is recorded
+    hot_loop_threshold = 50
+    # Loops with longer iterations are not traced
+    max_trace_length = 500
+
+    backward_jumps = ('JUMP', 'JUMPIFEQ', 'JUMPIFNEQ', 'JUMPIFEQS', 'JUMPIFNEQS')
+    # Instructions which can't be a part of a trace
+    untraceable = ('CALL', 'RETURN', 'EXIT')
+
+    arithmetics = ('ADD', 'SUB', 'MUL', 'IDIV', 'DIV')
+    logic = ('LT', 'GT', 'EQ', 'AND', 'OR')
+
+    def __init__(self, instructions: list):
+        self.instructions = instructions
+        # Traces keyed by the position of their backward jump
+        self.traces = dict()
+        self.counts = dict()
+        self.blacklist = set()
+        # Position of the jump whose loop is recorded and the recorded path: [position, operand types, next position]
+        self.recorded_jump = None
+        self.path = None
+
+    def run(self, ctx: Context):
+        # Traces and counters are kept for the next runs, but a path can't continue in another run
+        self.recorded_jump = None
+        self.path = None
+
+        instructions = self.instructions
+        traces = self.traces
+        while ctx.current_pos != len(instructions):
+            pos = ctx.current_pos
+            instruction = instructions[pos]
+            if self.path is not None:
+                self.record(ctx, pos, instruction)
+
+            instruction.handler(ctx)
+            instruction.update_stats(ctx)
+            ctx.current_pos += 1
+
+            if self.path is not None:
+                self.path[-1][2] = ctx.current_pos
+
+            if ctx.current_pos <= pos:
+                if ctx.limits is not None:
+                    ctx.check_limits()
+
+                if self.path is not None:
+                    self.backward_jump(pos)
+                elif pos in traces:
+                    traces[pos](ctx)
+                elif instruction.opcode in Tracer.backward_jumps:
+                    self.backward_jump(pos)
+
+    def backward_jump(self, pos: int):
+        if self.path is not None:
+            if pos == self.recorded_jump:
+                self.traces[pos] = self.compile(self.path)
+            else:
+                # Iterations with inner loops are not traced, inner loops get their own traces
+                self.blacklist.add(self.recorded_jump)
+            self.path = None
+            return
+
+        if pos in self.blacklist:
+            return
+
+        self.counts[pos] = self.counts.get(pos, 0) + 1
+        if self.counts[pos] >= Tracer.hot_loop_threshold:
+            self.recorded_jump = pos
+            self.path = []
+
+    def record(self, ctx: Context, pos: int, instruction: Instruction):
+        if instruction.opcode in Tracer.untraceable or len(self.path) == Tracer.max_trace_length:
+            self.blacklist.add(self.recorded_jump)
+            self.path = None
+            return
+
+        types = tuple(ctx.type_of(arg) for arg in instruction.args[1:3])
+        self.path.append([pos, types, None])
+
+    def compile(self, path: list) -> Trace:
+        trace = Trace([self.instructions[pos] for pos, _, _ in path])
+        generator = CodeGenerator(self.instructions)
+        side_exit = generator.name(trace.side_exit)
+
+        body = []
+        for index, (pos, types, next_pos) in enumerate(path):
+            i = self.instructions[pos]
+            if i.opcode == 'JUMP':
+                continue
+
+            plain = not hasattr(i, 'parts')
+            if plain and i.opcode == 'MOVE':
+                generator.gen_move(pos, i, body)
+            elif plain and i.opcode == 'WRITE':
+                self.gen_write(generator, pos, i, body)
+            elif plain and Tracer.guarded(i, types):
+                self.gen_guarded(generator, index, pos, i, types, next_pos, side_exit, body)
+            elif i.opcode in Tracer.backward_jumps:
+                # Conditional jump executed by its handler, the trace continues only in the recorded direction
+                body.append(f'p = ctx.current_pos = {pos}')
+                body.append(f'{generator.name(i)}.handler(ctx)')
+                body.append(f'if ctx.current_pos != {next_pos - 1}:')
+                body.append(f'    return {side_exit}(ctx, {index + 1}, ctx.current_pos + 1)')
+            else:
+                body.append(f'p = {pos}')
+                body.append(f'{generator.name(i)}.handler(ctx)')
+
+        lines = ['def trace(ctx):',
+                 '    G = ctx.GF.cells',
+                 '    h = ctx.stats.hot',
+                 '    p = ctx.current_pos',
+                 '    try:',
+                 '        while True:']
+        lines.extend('            ' + line for line in body)
+        for keys in trace.keys:
+            for key in keys:
+                key_name = generator.name(key)
+                lines.append(f'            h[{key_name}] = h.get({key_name}, 0) + 1')
+        lines.append(f'            ctx.stats.insts += {sum(trace.insts)}')
+        lines.append('            if ctx.limits is not None:')
+        lines.append('                ctx.check_limits()')
+        lines.append('    except InterpretError:')
+        lines.append('        ctx.current_pos = p')
+        lines.append('        raise')
+
+        exec(compile('\n'.join(lines) + '\n', '<IPPcode22 trace>', 'exec'), generator.namespace)
+        trace.function = generator.namespace['trace']
+        return trace
+
+    # Returns True, if the instruction can be generated with guards on the recorded types of its operands
+    @staticmethod
+    def guarded(i: Instruction, types: tuple) -> bool:
+        if i.opcode in Tracer.arithmetics or i.opcode in Tracer.logic \
+                or i.opcode in ('JUMPIFEQ', 'JUMPIFNEQ'):
+            return len(types) == 2 and types[0] == types[1] and types[0] in Instruction.quickened_types[i.opcode]
+        elif i.opcode == 'NOT':
+            return len(types) == 1 and types[0] == 'bool'
+
+        return False
+
+    @staticmethod
+    def gen_write(generator: CodeGenerator, pos: int, i: Instruction, body: list):
+        arg = i.args[0]
+        if arg.frame is None:
+            if arg.constant.type != 'nil':
+                body.append(f'ctx.output.write({generator.name(arg.constant.str_value())})')
+            return
+
+        body.append(f'p = {pos}')
+        var_type, _ = generator.read(arg, 'a', body)
+        body.append(f"if {var_type} != 'nil':")
+        body.append('    ctx.output.write(a.str_value())')
+
+    @staticmethod
+    def gen_guarded(generator: CodeGenerator, index: int, pos: int, i: Instruction, types: tuple, next_pos: int,
+                    side_exit: str, body: list):
+        body.append(f'p = {pos}')
+        values = []
+        guards = []
+        for arg, var in zip(i.args[1:], ('a', 'b')):
+            var_type, value = generator.read(arg, var, body)
+            values.append(value)
+            if arg.frame is not None:
+                guards.append(f'{var_type} != {types[0]!r}')
+
+        if guards:
+            body.append(f'if {" or ".join(guards)}:')
+            body.append(f'    return {side_exit}(ctx, {index}, {pos})')
+
+        if i.opcode in Tracer.arithmetics:
+            if i.opcode in ('IDIV', 'DIV'):
+                body.append(f'if {values[1]} == 0:')
+                body.append(f'    {generator.name(i)}.handler(ctx)')
+            operator = CodeGenerator.arithmetic_operators[i.opcode]
+            generator.write(i.args[0], repr(types[0]), f'{values[0]} {operator} {values[1]}', body)
+        elif i.opcode in Tracer.logic:
+            operator = CodeGenerator.logic_operators[i.opcode]
+            generator.write(i.args[0], "'bool'", f'{values[0]} {operator} {values[1]}', body)
+        elif i.opcode == 'NOT':
+            generator.write(i.args[0], "'bool'", f'not {values[0]}', body)
+        else:
+            taken = next_pos != pos + 1
+            operator = '==' if (i.opcode == 'JUMPIFEQ') == taken else '!='
+            exit_pos = pos + 1 if taken else i.target + 1
+            body.append(f'if not {values[0]} {operator} {values[1]}:')
+            body.append(f'    return {side_exit}(ctx, {index + 1}, {exit_pos})')
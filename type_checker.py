@@ -1,5 +1,5 @@
 from context import Context
-from exit_code import ExitCode
+from exit_code import ExitCode, InterpretError
 from variable import Variable
 
 
@@ -37,9 +37,9 @@ class TypeChecker:
                 type_check = True
 
         if not type_check:
-            ctx.error(
-                f"{caller_name} accepts only {', '.join(accepted_types)} arguments, but {variable.value} is of type {variable.type}")
-            exit(ExitCode.BAD_OPERAND_TYPE.value)
+            raise InterpretError(
+                ExitCode.BAD_OPERAND_TYPE,
+                f"{caller_name} accepts only {', '.join(accepted_types)} arguments, but {variable.str_value()} is of type {variable.type}")
 
     @staticmethod
     def str_convertable_check(ctx, variable):
@@ -47,11 +47,14 @@ class TypeChecker:
             'int': TypeChecker.str_is_int,
             'float': TypeChecker.str_is_float
         }
-        if variable.type in convertible_check_functions.keys():
+        if type(variable.value) is not str:
+            is_convertable = True
+        elif variable.type in convertible_check_functions.keys():
             is_convertable = convertible_check_functions[variable.type](variable.value)
         else:
             is_convertable = True
 
         if not is_convertable:
-            ctx.error(f"Value {variable.value} can't be converted to {variable.type}. Check your XML source.")
-            exit(ExitCode.UNEXPECTED_XML_STRUCTURE.value)
+            raise InterpretError(
+                ExitCode.UNEXPECTED_XML_STRUCTURE,
+                f"Value {variable.value} can't be converted to {variable.type}. Check your XML source.")
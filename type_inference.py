@@ -0,0 +1,125 @@
+from exit_code import ExitCode, InterpretError
+
+
+# Flow-insensitive analysis of the types variables can hold. Every variable gets the set of types of all values
+# which can be stored to it anywhere in the program. Instructions whose operands have proven types are marked,
+# so they don't check the types at runtime.
+class TypeInference:
+    all_types = frozenset(('int', 'float', 'bool', 'nil', 'string'))
+    numeric = frozenset(('int', 'float'))
+
+    # Types of the result of instructions which don't depend on the operands
+    result_types = {
+        'DIV': {'float'},
+        'LT': {'bool'},
+        'GT': {'bool'},
+        'EQ': {'bool'},
+        'AND': {'bool'},
+        'OR': {'bool'},
+        'NOT': {'bool'},
+        'INT2CHAR': {'string'},
+        'STRI2INT': {'int'},
+        'INT2FLOAT': {'float'},
+        'FLOAT2INT': {'int'},
+        'CONCAT': {'string'},
+        'STRLEN': {'int'},
+        'GETCHAR': {'string'},
+        'SETCHAR': {'string'},
+        'TYPE': {'string'},
+        'POPS': all_types,
+    }
+
+    read_types = {
+        'int': {'int', 'nil'},
+        'float': {'float', 'nil'},
+        'bool': {'bool'},
+        'string': {'string'},
+    }
+
+    def __init__(self, instructions: list):
+        self.instructions = instructions
+        self.types = dict()
+
+    def run(self):
+        self.check_constants()
+
+        changed = True
+        while changed:
+            changed = False
+            for i in self.instructions:
+                result = self.result_of(i)
+                if result:
+                    var_types = self.types.setdefault(TypeInference.key(i.args[0]), set())
+                    if not result <= var_types:
+                        var_types |= result
+                        changed = True
+
+        for i in self.instructions:
+            i.types_checked = self.is_checked(i)
+
+    # Literals are converted when the program is loaded, the ones which can't be converted stay strings
+    # (empty literals are None)
+    def check_constants(self):
+        for i in self.instructions:
+            for arg in i.args:
+                if arg.frame is None and arg.type in TypeInference.numeric \
+                        and (arg.constant.value is None or type(arg.constant.value) is str):
+                    raise InterpretError(
+                        ExitCode.UNEXPECTED_XML_STRUCTURE,
+                        f"Value {arg.value} can't be converted to {arg.type}. Check your XML source.")
+
+    # Local and temporary variables share the key, because PUSHFRAME turns the temporary frame into a local one
+    @staticmethod
+    def key(arg) -> tuple:
+        return 'LF' if arg.frame == 'TF' else arg.frame, arg.name
+
+    def types_of(self, arg) -> set:
+        if arg.frame is None:
+            return {arg.type}
+
+        return self.types.get(TypeInference.key(arg), set())
+
+    # Returns the types the instruction can store to its first argument
+    def result_of(self, i) -> set or None:
+        if i.opcode == 'MOVE':
+            return self.types_of(i.args[1])
+        elif i.opcode in ('ADD', 'SUB', 'MUL', 'IDIV'):
+            return self.types_of(i.args[1]) & TypeInference.numeric
+        elif i.opcode == 'READ':
+            return TypeInference.read_types.get(i.args[1].value)
+
+        return TypeInference.result_types.get(i.opcode)
+
+    # Returns the only type of the argument or None, if it is not known
+    def single_type(self, arg) -> str or None:
+        types = self.types_of(arg)
+        if len(types) != 1:
+            return None
+
+        return next(iter(types))
+
+    def is_checked(self, i) -> bool:
+        if i.opcode in ('ADD', 'SUB', 'MUL', 'IDIV', 'DIV'):
+            type1 = self.single_type(i.args[1])
+            allowed = {'float'} if i.opcode == 'DIV' else TypeInference.numeric
+            return type1 in allowed and type1 == self.single_type(i.args[2])
+        elif i.opcode in ('LT', 'GT'):
+            type1 = self.single_type(i.args[1])
+            return type1 in ('int', 'float', 'string', 'bool') and type1 == self.single_type(i.args[2])
+        elif i.opcode in ('EQ', 'JUMPIFEQ', 'JUMPIFNEQ'):
+            type1 = self.single_type(i.args[1])
+            type2 = self.single_type(i.args[2])
+            return type1 is not None and type2 is not None and (type1 == type2 or 'nil' in (type1, type2))
+        elif i.opcode in ('AND', 'OR'):
+            return self.single_type(i.args[1]) == 'bool' and self.single_type(i.args[2]) == 'bool'
+        elif i.opcode == 'NOT':
+            return self.single_type(i.args[1]) == 'bool'
+        elif i.opcode == 'INT2CHAR':
+            return self.single_type(i.args[1]) == 'int'
+        elif i.opcode == 'STRI2INT':
+            return self.single_type(i.args[1]) == 'string' and self.single_type(i.args[2]) == 'int'
+        elif i.opcode == 'WRITE':
+            types = self.types_of(i.args[0])
+            return len(types) != 0 and types <= TypeInference.all_types
+
+        return False
@@ -1,37 +1,24 @@
+# Value of a variable or a constant. The value is stored as a native Python value of the type:
+# int, float, bool, str or None (nil). Declared but not initialized variables have the type None.
 class Variable:
+    __slots__ = ('type', 'value')
+
     def __init__(self, var_type, value):
         self.type = var_type
         self.value = value
 
-        if self.type == 'string' and self.value is None:
-            self.value = ''
-        elif self.type == 'bool' and type(self.value) is bool:
-            if self.value:
-                self.value = 'true'
-            else:
-                self.value = 'false'
-
     def __str__(self):
-        return f"{self.type}@{self.value}"
+        return f"{self.type}@{self.str_value()}"
 
-    def unwrap(self):
-        if self.type == 'int':
-            return int(self.value)
+    # Returns the value in the format of IPPcode22 (as printed by WRITE)
+    def str_value(self) -> str:
+        if self.type == 'bool':
+            return 'true' if self.value else 'false'
         elif self.type == 'float':
-            return self.float_value()
-        elif self.type == 'bool':
-            return self.value.lower() == 'true'
-        elif self.type == 'string':
-            return self.value
-        else:
-            return None
-
-    def float_value(self) -> float:
-        if self.type != 'float' and self.type != 'int':
-            raise ValueError()
-
-        try:
-            return float(self.value)
-        except ValueError:
-            return float.fromhex(self.value)
+            return self.value.hex() if type(self.value) is float else str(self.value)
+        elif self.type == 'nil':
+            return 'nil'
+        elif self.value is None:
+            return ''
 
+        return str(self.value)